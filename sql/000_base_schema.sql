@@ -0,0 +1,45 @@
+-- Esquema base del worker (tal como existía antes de 001). despacho_ingreso_procesos
+-- pertenece a la aplicación principal y no se crea aquí.
+CREATE TABLE IF NOT EXISTS vigilancia_control (
+  proceso_id BIGINT NOT NULL PRIMARY KEY,
+  next_run_at DATETIME NULL,
+  cooldown_until DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  last_run_at DATETIME NULL,
+  last_success_at DATETIME NULL,
+  last_error_code VARCHAR(32) NULL,
+  last_error_message TEXT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS actuaciones_x_proceso (
+  id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  proceso_id BIGINT NOT NULL,
+  fuente VARCHAR(16) NOT NULL,
+  hash CHAR(40) NOT NULL,
+  fecha_actuacion VARCHAR(32) NULL,
+  actuacion TEXT NULL,
+  anotacion TEXT NULL,
+  fecha_inicia_termino VARCHAR(32) NULL,
+  fecha_finaliza_termino VARCHAR(32) NULL,
+  fecha_registro VARCHAR(32) NULL,
+  raw_row_json LONGTEXT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_axp_proceso_fuente_hash (proceso_id, fuente, hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS worker_runs (
+  id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  proceso_id BIGINT NOT NULL,
+  fuente VARCHAR(16) NOT NULL,
+  status VARCHAR(32) NOT NULL,
+  started_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  finished_at DATETIME NULL,
+  used_mode VARCHAR(16) NULL,
+  rows_extracted INT NULL,
+  rows_inserted INT NULL,
+  notified TINYINT(1) NULL,
+  error_message TEXT NULL,
+  artifact_screenshot_path VARCHAR(512) NULL,
+  artifact_html_path VARCHAR(512) NULL,
+  KEY idx_wr_proceso (proceso_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
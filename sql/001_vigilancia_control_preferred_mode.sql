@@ -0,0 +1,6 @@
+-- Modo de consulta CPNU que necesitó cada radicado la última vez (RECIENTES / TODOS)
+ALTER TABLE vigilancia_control
+  ADD COLUMN preferred_mode VARCHAR(16) NULL;
+
+ALTER TABLE vigilancia_control
+  ADD COLUMN mode_checked_at DATETIME NULL;
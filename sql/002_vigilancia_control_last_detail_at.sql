@@ -0,0 +1,3 @@
+-- Última vez que se leyó la vista de detalle (Actuaciones) y no sólo la fila de resultados
+ALTER TABLE vigilancia_control
+  ADD COLUMN last_detail_at DATETIME NULL;
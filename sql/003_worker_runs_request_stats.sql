@@ -0,0 +1,9 @@
+-- Peticiones permitidas/bloqueadas por la política de recursos y bytes descargados por corrida
+ALTER TABLE worker_runs
+  ADD COLUMN req_allowed INT NULL;
+
+ALTER TABLE worker_runs
+  ADD COLUMN req_blocked INT NULL;
+
+ALTER TABLE worker_runs
+  ADD COLUMN bytes_allowed BIGINT NULL;
@@ -0,0 +1,3 @@
+-- Bundles estáticos servidos desde la caché en disco por corrida
+ALTER TABLE worker_runs
+  ADD COLUMN req_cached INT NULL;
@@ -0,0 +1,13 @@
+-- Leases para que varios workers (en distintas máquinas) no tomen el mismo proceso
+ALTER TABLE vigilancia_control
+  ADD COLUMN lease_owner VARCHAR(128) NULL;
+
+ALTER TABLE vigilancia_control
+  ADD COLUMN lease_until DATETIME NULL;
+
+ALTER TABLE vigilancia_control
+  ADD INDEX idx_vc_lease_until (lease_until);
+
+-- Qué worker hizo cada corrida (para diagnosticar corridas abandonadas)
+ALTER TABLE worker_runs
+  ADD COLUMN worker_id VARCHAR(128) NULL;
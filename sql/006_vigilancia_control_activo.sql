@@ -0,0 +1,7 @@
+-- Fila de control activa/inactiva según dip.vigilancia_activa (la mantiene el bootstrap por conjuntos)
+ALTER TABLE vigilancia_control
+  ADD COLUMN activo TINYINT(1) NOT NULL DEFAULT 1;
+
+UPDATE vigilancia_control vc
+JOIN despacho_ingreso_procesos dip ON dip.id = vc.proceso_id
+SET vc.activo = IF(dip.vigilancia_activa = 1, 1, 0);
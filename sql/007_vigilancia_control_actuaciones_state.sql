@@ -0,0 +1,10 @@
+-- Estado de actuaciones denormalizado (lo mantiene run_one_process en la misma transacción de los inserts).
+-- NULL = sin backfill todavía: el worker cae a las consultas agregadas. Backfill: run_worker.py --backfill-state
+ALTER TABLE vigilancia_control
+  ADD COLUMN actuaciones_count INT NULL;
+
+ALTER TABLE vigilancia_control
+  ADD COLUMN last_fecha_actuacion VARCHAR(32) NULL;
+
+ALTER TABLE vigilancia_control
+  ADD COLUMN last_hash CHAR(40) NULL;
@@ -0,0 +1,28 @@
+-- Cola de vencidos sargable: sin NULLs en next_run_at/lease_until y con next_run_at >= cooldown_until,
+-- el predicado queda "activo = 1 AND next_run_at <= NOW() AND lease_until <= NOW()" ordenado por next_run_at.
+UPDATE vigilancia_control SET next_run_at = NOW() WHERE next_run_at IS NULL;
+UPDATE vigilancia_control SET next_run_at = cooldown_until WHERE cooldown_until > next_run_at;
+UPDATE vigilancia_control SET lease_until = '1970-01-01 00:00:00' WHERE lease_until IS NULL;
+
+ALTER TABLE vigilancia_control
+  MODIFY COLUMN next_run_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
+
+ALTER TABLE vigilancia_control
+  MODIFY COLUMN lease_until DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00';
+
+ALTER TABLE vigilancia_control
+  ADD INDEX idx_vc_due (activo, next_run_at, lease_until);
+
+ALTER TABLE vigilancia_control
+  DROP INDEX idx_vc_lease_until;
+
+-- Watermark / conteo por proceso y pre-chequeo de hashes del insert masivo
+ALTER TABLE actuaciones_x_proceso
+  ADD INDEX idx_axp_proceso_fuente_fecha (proceso_id, fuente, fecha_actuacion);
+
+ALTER TABLE actuaciones_x_proceso
+  ADD UNIQUE KEY uq_axp_proceso_fuente_hash (proceso_id, fuente, hash);
+
+-- Reaper de corridas RUNNING
+ALTER TABLE worker_runs
+  ADD INDEX idx_wr_status_started (status, started_at);
@@ -0,0 +1,49 @@
+-- Fechas de actuaciones como DATE: el watermark se compara como fecha y MAX/rangos salen del índice.
+-- Antes de convertir: vacíos a NULL y dd/mm/aaaa a ISO (lo que no sea fecha queda NULL; el texto sigue en raw_row_json).
+UPDATE actuaciones_x_proceso SET fecha_actuacion = NULL WHERE fecha_actuacion = '';
+UPDATE actuaciones_x_proceso SET fecha_inicia_termino = NULL WHERE fecha_inicia_termino = '';
+UPDATE actuaciones_x_proceso SET fecha_finaliza_termino = NULL WHERE fecha_finaliza_termino = '';
+UPDATE actuaciones_x_proceso SET fecha_registro = NULL WHERE fecha_registro = '';
+
+UPDATE actuaciones_x_proceso
+SET fecha_actuacion = DATE_FORMAT(STR_TO_DATE(fecha_actuacion, '%d/%m/%Y'), '%Y-%m-%d')
+WHERE fecha_actuacion REGEXP '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$';
+UPDATE actuaciones_x_proceso
+SET fecha_inicia_termino = DATE_FORMAT(STR_TO_DATE(fecha_inicia_termino, '%d/%m/%Y'), '%Y-%m-%d')
+WHERE fecha_inicia_termino REGEXP '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$';
+UPDATE actuaciones_x_proceso
+SET fecha_finaliza_termino = DATE_FORMAT(STR_TO_DATE(fecha_finaliza_termino, '%d/%m/%Y'), '%Y-%m-%d')
+WHERE fecha_finaliza_termino REGEXP '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$';
+UPDATE actuaciones_x_proceso
+SET fecha_registro = DATE_FORMAT(STR_TO_DATE(fecha_registro, '%d/%m/%Y'), '%Y-%m-%d')
+WHERE fecha_registro REGEXP '^[0-9]{1,2}/[0-9]{1,2}/[0-9]{4}$';
+
+UPDATE actuaciones_x_proceso SET fecha_actuacion = LEFT(fecha_actuacion, 10) WHERE fecha_actuacion REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}.';
+UPDATE actuaciones_x_proceso SET fecha_inicia_termino = LEFT(fecha_inicia_termino, 10) WHERE fecha_inicia_termino REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}.';
+UPDATE actuaciones_x_proceso SET fecha_finaliza_termino = LEFT(fecha_finaliza_termino, 10) WHERE fecha_finaliza_termino REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}.';
+UPDATE actuaciones_x_proceso SET fecha_registro = LEFT(fecha_registro, 10) WHERE fecha_registro REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}.';
+
+UPDATE actuaciones_x_proceso SET fecha_actuacion = NULL WHERE fecha_actuacion NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$';
+UPDATE actuaciones_x_proceso SET fecha_inicia_termino = NULL WHERE fecha_inicia_termino NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$';
+UPDATE actuaciones_x_proceso SET fecha_finaliza_termino = NULL WHERE fecha_finaliza_termino NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$';
+UPDATE actuaciones_x_proceso SET fecha_registro = NULL WHERE fecha_registro NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$';
+
+ALTER TABLE actuaciones_x_proceso
+  MODIFY COLUMN fecha_actuacion DATE NULL;
+
+ALTER TABLE actuaciones_x_proceso
+  MODIFY COLUMN fecha_inicia_termino DATE NULL;
+
+ALTER TABLE actuaciones_x_proceso
+  MODIFY COLUMN fecha_finaliza_termino DATE NULL;
+
+ALTER TABLE actuaciones_x_proceso
+  MODIFY COLUMN fecha_registro DATE NULL;
+
+UPDATE vigilancia_control SET last_fecha_actuacion = LEFT(last_fecha_actuacion, 10)
+WHERE last_fecha_actuacion REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}';
+UPDATE vigilancia_control SET last_fecha_actuacion = NULL, actuaciones_count = NULL
+WHERE last_fecha_actuacion IS NOT NULL AND last_fecha_actuacion NOT REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$';
+
+ALTER TABLE vigilancia_control
+  MODIFY COLUMN last_fecha_actuacion DATE NULL;
@@ -0,0 +1,7 @@
+-- Payload crudo comprimido (zlib) por hash para RAW_STORAGE_MODE=compressed.
+-- Las filas existentes se pasan al modo configurado con: run_worker.py --migrate-raw
+CREATE TABLE IF NOT EXISTS actuaciones_raw (
+  hash CHAR(40) NOT NULL PRIMARY KEY,
+  payload MEDIUMBLOB NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
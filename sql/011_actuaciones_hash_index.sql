@@ -0,0 +1,4 @@
+-- actuaciones_raw va por hash y el mismo hash puede estar en varios proceso_id:
+-- --migrate-raw busca por hash qué filas todavía dependen de un payload antes de borrarlo
+ALTER TABLE actuaciones_x_proceso
+  ADD INDEX idx_axp_hash (hash);
@@ -0,0 +1,93 @@
+import json
+from datetime import date
+from typing import Any, Dict, Optional
+
+from .normalize import make_hash, parse_cpnu_date
+
+# Campos de texto en el orden de la tabla CPNU (y del hash)
+TEXT_FIELDS = (
+    "fecha_actuacion",
+    "actuacion",
+    "anotacion",
+    "fecha_inicia_termino",
+    "fecha_finaliza_termino",
+    "fecha_registro",
+)
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+class Actuacion:
+    """
+    Una actuación CPNU tal como pasa por el pipeline: textos originales (solo
+    sin espacios en los extremos, se conservan los saltos de línea) y fechas
+    parseadas una sola vez al extraerla; el hash (normalize.make_hash, que
+    normaliza por su cuenta) y el JSON de auditoría se calculan al primer uso
+    y quedan guardados en la instancia.
+    """
+
+    __slots__ = (
+        "radicado",
+        "fecha_actuacion",
+        "actuacion",
+        "anotacion",
+        "fecha_inicia_termino",
+        "fecha_finaliza_termino",
+        "fecha_registro",
+        "fecha",
+        "fecha_inicia",
+        "fecha_finaliza",
+        "fecha_reg",
+        "_hash",
+        "_json",
+    )
+
+    def __init__(
+        self,
+        radicado: str,
+        fecha_actuacion: Any = None,
+        actuacion: Any = None,
+        anotacion: Any = None,
+        fecha_inicia_termino: Any = None,
+        fecha_finaliza_termino: Any = None,
+        fecha_registro: Any = None,
+    ):
+        self.radicado = _text(radicado)
+        self.fecha_actuacion = _text(fecha_actuacion)
+        self.actuacion = _text(actuacion)
+        self.anotacion = _text(anotacion)
+        self.fecha_inicia_termino = _text(fecha_inicia_termino)
+        self.fecha_finaliza_termino = _text(fecha_finaliza_termino)
+        self.fecha_registro = _text(fecha_registro)
+        self.fecha: Optional[date] = parse_cpnu_date(self.fecha_actuacion)
+        self.fecha_inicia: Optional[date] = parse_cpnu_date(self.fecha_inicia_termino)
+        self.fecha_finaliza: Optional[date] = parse_cpnu_date(self.fecha_finaliza_termino)
+        self.fecha_reg: Optional[date] = parse_cpnu_date(self.fecha_registro)
+        self._hash: Optional[str] = None
+        self._json: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, radicado: str, row: Dict[str, Any]) -> "Actuacion":
+        return cls(radicado, *(row.get(k) for k in TEXT_FIELDS))
+
+    @property
+    def hash(self) -> str:
+        h = self._hash
+        if h is None:
+            h = self._hash = make_hash(self.radicado, self.to_dict())
+        return h
+
+    @property
+    def json(self) -> str:
+        j = self._json
+        if j is None:
+            j = self._json = json.dumps(self.to_dict(), ensure_ascii=False)
+        return j
+
+    def to_dict(self) -> Dict[str, str]:
+        return {k: getattr(self, k) for k in TEXT_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"Actuacion({self.fecha_actuacion!r}, {self.actuacion!r})"
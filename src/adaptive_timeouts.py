@@ -0,0 +1,106 @@
+import json
+import math
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from playwright.async_api import TimeoutError as PWTimeoutError
+
+from .settings import settings
+from .fsutil import save_json
+
+# Timeouts fijos que usaba el scraper; se usan mientras no haya muestras suficientes
+DEFAULT_TIMEOUTS_MS: Dict[str, int] = {
+    "goto": 60000,
+    "form_ready": 60000,
+    "click": 15000,
+    "query": 60000,
+    "results": 60000,
+    "detail_tab": 60000,
+    "table": 30000,
+}
+
+
+class AdaptiveTimeouts:
+    """
+    Timeout por fase del flujo CPNU derivado de la latencia observada:
+    percentil (p. ej. p99) de las últimas N duraciones × factor, acotado entre
+    piso y techo; en periodos lentos puede pasar del timeout fijo de la fase.
+    Un timeout es una muestra censurada: solo dice que la fase tardó más que
+    el límite vigente. Si el percentil cae en una, el límite sube un paso
+    (límite censurado × factor, hasta el techo) y vuelve a subir solo si
+    también se agota el nuevo límite, en vez de saltar directo al techo.
+    Las ventanas se guardan en JSON para sobrevivir entre ejecuciones; las
+    muestras censuradas se guardan con signo negativo.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = settings.adaptive_timeouts_path if path is None else path
+        self.window = max(1, int(settings.adaptive_timeouts_window))
+        self.min_samples = max(1, int(settings.adaptive_timeouts_min_samples))
+        self.percentile = float(settings.adaptive_timeouts_percentile)
+        self.factor = float(settings.adaptive_timeouts_factor)
+        self.floor_ms = int(settings.adaptive_timeouts_floor_ms)
+        self.ceil_ms = int(settings.adaptive_timeouts_ceil_ms)
+        self._samples: Dict[str, Deque[int]] = {}
+        self.load()
+
+    def _window(self, phase: str) -> Deque[int]:
+        w = self._samples.get(phase)
+        if w is None:
+            w = self._samples[phase] = deque(maxlen=self.window)
+        return w
+
+    def observe(self, phase: str, elapsed_ms: float, timed_out: bool = False) -> None:
+        ms = max(1, int(elapsed_ms))
+        self._window(phase).append(-ms if timed_out else ms)
+
+    def get(self, phase: str) -> int:
+        default = DEFAULT_TIMEOUTS_MS.get(phase, 30000)
+        if not settings.adaptive_timeouts:
+            return default
+        samples = self._samples.get(phase)
+        if not samples or len(samples) < self.min_samples:
+            return default
+        # Censuradas (negativas) ordenan por su duración y, a igual duración, después de las completas
+        ordered = sorted(samples, key=lambda v: (abs(v), v < 0))
+        k = min(len(ordered) - 1, max(0, math.ceil(self.percentile * len(ordered)) - 1))
+        # Completa: percentil × factor. Censurada: un paso sobre el límite que se agotó
+        return int(min(self.ceil_ms, max(self.floor_ms, abs(ordered[k]) * self.factor)))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[int]:
+        """Entrega el timeout de la fase y registra cuánto tardó (éxito o timeout)."""
+        start = time.monotonic()
+        try:
+            yield self.get(name)
+        except PWTimeoutError:
+            self.observe(name, (time.monotonic() - start) * 1000, timed_out=True)
+            raise
+        else:
+            self.observe(name, (time.monotonic() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {
+            phase: {"samples": len(self._samples.get(phase) or ()), "timeout_ms": self.get(phase)}
+            for phase in sorted(set(DEFAULT_TIMEOUTS_MS) | set(self._samples))
+        }
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for phase, values in (data or {}).items():
+            w = self._window(phase)
+            w.extend(int(v) for v in values if isinstance(v, (int, float)))
+
+    def save(self) -> None:
+        save_json(self.path, {phase: list(w) for phase, w in self._samples.items()})
+
+
+timeouts = AdaptiveTimeouts()
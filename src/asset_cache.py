@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from .settings import settings
+from .fsutil import write_atomic
+
+BUILD_FILE = "BUILD"
+
+
+class AssetCache:
+    """
+    Caché en disco de los bundles estáticos (JS/CSS) del SPA de CPNU.
+    Cada entrada es <sha1(url)>.body + <sha1(url)>.meta. Tiene tope de tamaño
+    con expulsión LRU (por mtime), vencimiento por edad y se vacía completa
+    cuando cambia la firma del build (el HTML de entrada del SPA).
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_age_seconds: Optional[int] = None,
+    ):
+        self.directory = directory or settings.asset_cache_dir
+        self.max_bytes = int(max_bytes if max_bytes is not None else settings.asset_cache_max_mb * 1024 * 1024)
+        self.max_age_seconds = int(
+            max_age_seconds if max_age_seconds is not None else settings.asset_cache_max_age_hours * 3600
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def get(self, url: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        base = self._key(url)
+        try:
+            if time.time() - os.path.getmtime(base + ".meta") > self.max_age_seconds:
+                self._remove(base)
+                return None
+            with open(base + ".meta", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(base + ".body", "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # LRU: la lectura cuenta como uso reciente (sin tocar la edad de la meta)
+        try:
+            os.utime(base + ".body")
+        except OSError:
+            pass
+        return int(meta.get("status", 200)), dict(meta.get("headers") or {}), body
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        base = self._key(url)
+        keep = {k: v for k, v in headers.items() if k.lower() in ("content-type", "etag", "last-modified")}
+        write_atomic(base + ".body", body)
+        write_atomic(
+            base + ".meta",
+            json.dumps({"url": url, "status": status, "headers": keep}).encode("utf-8"),
+        )
+        self.evict()
+
+    def evict(self) -> None:
+        bodies = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".body"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            bodies.append((st.st_mtime, st.st_size, path[: -len(".body")]))
+            total += st.st_size
+
+        for _, size, base in sorted(bodies):
+            if total <= self.max_bytes:
+                break
+            self._remove(base)
+            total -= size
+
+    def check_build(self, signature: str) -> bool:
+        """Vacía la caché si cambió la firma del build. Devuelve True si se invalidó."""
+        path = os.path.join(self.directory, BUILD_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                if f.read().strip() == signature:
+                    return False
+        except OSError:
+            pass
+        self.clear()
+        write_atomic(path, signature.encode("utf-8"))
+        return True
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(".body") or name.endswith(".meta"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _remove(self, base: str) -> None:
+        for ext in (".body", ".meta"):
+            try:
+                os.remove(base + ext)
+            except OSError:
+                pass
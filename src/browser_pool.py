@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import async_playwright
+
+from .asset_cache import AssetCache
+from .settings import settings
+from .fsutil import atomic_path
+
+VIEWPORT = {"width": 1400, "height": 900}
+
+
+class _BrowserSlot:
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Mantiene un Chromium vivo entre radicados y entrega un contexto/página
+    nuevo por cada uso. El navegador se recicla al llegar a max_uses y se
+    reemplaza si se cae (desconexión o página crasheada); el retirado se
+    cierra cuando terminan las páginas que aún lo usan.
+
+    Los contextos nuevos arrancan con el storage state guardado (cookies /
+    localStorage de CPNU) y comparten la caché en disco de bundles estáticos.
+    """
+
+    def __init__(self, headless: Optional[bool] = None, max_uses: Optional[int] = None):
+        self.headless = settings.headless if headless is None else headless
+        self.max_uses = max(1, int(max_uses if max_uses is not None else settings.browser_max_uses))
+        self._pw = None
+        self._current: Optional[_BrowserSlot] = None
+        self._lock = asyncio.Lock()
+        self.launches = 0
+        self.asset_cache: Optional[AssetCache] = AssetCache() if settings.asset_cache else None
+        self.storage_state_path = settings.storage_state_path or None
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        if self._pw is None:
+            self._pw = await async_playwright().start()
+
+    async def close(self) -> None:
+        if self._current is not None:
+            await self._close_browser(self._current)
+            self._current = None
+        if self._pw is not None:
+            try:
+                await self._pw.stop()
+            except Exception:
+                pass
+            self._pw = None
+
+    async def _close_browser(self, slot: _BrowserSlot) -> None:
+        try:
+            await slot.browser.close()
+        except Exception:
+            pass
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            await self.start()
+            slot = self._current
+            if slot is not None and (slot.retired or not slot.browser.is_connected()):
+                slot.retired = True
+                self._current = None
+                if slot.active == 0:
+                    await self._close_browser(slot)
+                slot = None
+
+            if slot is None:
+                browser = await self._pw.chromium.launch(
+                    headless=self.headless,
+                    args=list(settings.chromium_args),
+                )
+                slot = self._current = _BrowserSlot(browser)
+                self.launches += 1
+
+            slot.uses += 1
+            slot.active += 1
+            if slot.uses >= self.max_uses:
+                slot.retired = True
+            return slot
+
+    async def _release_slot(self, slot: _BrowserSlot, crashed: bool) -> None:
+        async with self._lock:
+            slot.active -= 1
+            if crashed or not slot.browser.is_connected():
+                slot.retired = True
+            if slot.retired and slot.active == 0:
+                if self._current is slot:
+                    self._current = None
+                await self._close_browser(slot)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator:
+        slot = await self._acquire_slot()
+        crashed = {"v": False}
+        context = None
+
+        try:
+            state = self.storage_state_path if self.storage_state_path and os.path.exists(self.storage_state_path) else None
+            context = await slot.browser.new_context(viewport=VIEWPORT, storage_state=state)
+            page = await context.new_page()
+            page.on("crash", lambda _p: crashed.__setitem__("v", True))
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    crashed["v"] = True
+            else:
+                crashed["v"] = True
+            await self._release_slot(slot, crashed["v"])
+
+    async def save_storage_state(self, page) -> None:
+        # Se refresca como máximo cada STORAGE_STATE_REFRESH_MINUTES; escritura atómica
+        path = self.storage_state_path
+        if not path:
+            return
+        try:
+            if os.path.exists(path) and time.time() - os.path.getmtime(path) < settings.storage_state_refresh_minutes * 60:
+                return
+            with atomic_path(path) as tmp:
+                await page.context.storage_state(path=tmp)
+        except Exception:
+            pass
@@ -0,0 +1,146 @@
+import itertools
+import json
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+from .settings import settings
+from .fsutil import save_json
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+# Códigos que indican que el problema es del sitio (caída o bloqueo), no del proceso
+TRIP_CODES = ("TIMEOUT", "NETWORK", "SOFTBLOCK")
+
+
+class CircuitBreaker:
+    """
+    Breaker compartido por todo el worker frente a CPNU. Se abre cuando en los
+    últimos `window` resultados hay `threshold` o más fallas de sitio
+    (TIMEOUT/NETWORK/SOFTBLOCK). Abierto no deja scrapear; pasado open_seconds
+    pasa a HALF_OPEN y deja pasar un único radicado de prueba: si sale bien
+    se cierra, si falla vuelve a abrir.
+
+    allow() entrega un ticket por corrida admitida y record() lo recibe de
+    vuelta, así en HALF_OPEN solo el resultado de la prueba decide (no el de
+    una corrida admitida antes de abrir que termina después). La ventana y
+    el fin de la apertura (hora de pared) se guardan en JSON: en modo cron
+    cada ejecución ve pocos radicados y sin esto el breaker nunca llegaría
+    al umbral ni seguiría abierto en la ejecución siguiente.
+    """
+
+    def __init__(
+        self,
+        window: Optional[int] = None,
+        threshold: Optional[int] = None,
+        open_seconds: Optional[int] = None,
+        trip_codes: Iterable[str] = TRIP_CODES,
+        path: Optional[str] = None,
+    ):
+        self.window = max(1, int(window if window is not None else settings.breaker_window))
+        self.threshold = max(1, int(threshold if threshold is not None else settings.breaker_threshold))
+        self.open_seconds = int(open_seconds if open_seconds is not None else settings.breaker_open_minutes * 60)
+        self.trip_codes = frozenset(c.upper() for c in trip_codes)
+        self.path = settings.breaker_state_path if path is None else path
+        self.state = CLOSED
+        self._recent: Deque[bool] = deque(maxlen=self.window)
+        self._opened_until = 0.0
+        self._tickets = itertools.count(1)
+        self._probe: Optional[int] = None
+        self.trips = 0
+        self.load()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_until = time.time() + self.open_seconds
+        self._probe = None
+        self.trips += 1
+
+    def allow(self) -> Optional[int]:
+        """Ticket para pasar a record()/cancel(), o None si no se puede scrapear."""
+        if self.state == CLOSED:
+            return next(self._tickets)
+        if self.state == OPEN:
+            if time.time() < self._opened_until:
+                return None
+            self.state = HALF_OPEN
+        # HALF_OPEN: un solo radicado de prueba a la vez
+        if self._probe is not None:
+            return None
+        self._probe = next(self._tickets)
+        return self._probe
+
+    def record(self, code: Optional[str], ticket: Optional[int]) -> None:
+        tripped = (code or "").upper() in self.trip_codes
+
+        if self.state == HALF_OPEN:
+            if ticket is None or ticket != self._probe:
+                return
+            self._probe = None
+            if tripped:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._opened_until = 0.0
+                self._recent.clear()
+            self.save()
+            return
+
+        if self.state != CLOSED:
+            return
+
+        self._recent.append(tripped)
+        if sum(self._recent) >= self.threshold:
+            self._open()
+        self.save()
+
+    def cancel(self, ticket: Optional[int]) -> None:
+        # La corrida terminó sin resultado (excepción): libera la prueba sin decidir
+        if ticket is not None and ticket == self._probe:
+            self._probe = None
+
+    def remaining_seconds(self) -> int:
+        if self.state != OPEN:
+            return 0
+        return max(0, int(self._opened_until - time.time()))
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        self._recent.extend(bool(v) for v in data.get("recent") or ())
+        self.trips = int(data.get("trips") or 0)
+        self._opened_until = float(data.get("opened_until") or 0.0)
+        if self._opened_until:
+            # Vencida la apertura, allow() pasa a HALF_OPEN con la primera corrida
+            self.state = OPEN
+
+    def save(self) -> None:
+        save_json(
+            self.path,
+            {
+                "recent": [int(v) for v in self._recent],
+                "opened_until": self._opened_until if self.state != CLOSED else 0.0,
+                "trips": self.trips,
+            },
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "recent_failures": sum(self._recent),
+            "window": len(self._recent),
+            "trips": self.trips,
+            "reopens_in_s": self.remaining_seconds(),
+        }
+
+
+breaker = CircuitBreaker()
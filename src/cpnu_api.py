@@ -0,0 +1,188 @@
+import http.client
+import json
+import ssl
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+from .settings import settings
+
+
+class CpnuApiError(Exception):
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class _ConnectionPool:
+    """Conexiones HTTP keep-alive reutilizables hacia un mismo host (thread-safe)."""
+
+    def __init__(self, base_url: str, max_idle: int, timeout: float, verify_ssl: bool):
+        u = urlparse(base_url)
+        self.scheme = u.scheme or "https"
+        self.host = u.hostname or ""
+        self.port = u.port
+        self.prefix = (u.path or "").rstrip("/")
+        self.max_idle = max(1, int(max_idle))
+        self.timeout = timeout
+        self._ssl = ssl.create_default_context() if verify_ssl else ssl._create_unverified_context()
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def _new(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self._ssl)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _take(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._new()
+
+    def _give(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        url = self.prefix + path + ("?" + urlencode(params) if params else "")
+        headers = {"Accept": "application/json", "Connection": "keep-alive", "User-Agent": "vigia-worker"}
+
+        # Una conexión reutilizada puede haber sido cerrada por el servidor: se reintenta una vez en limpio
+        for attempt in (0, 1):
+            conn = self._take() if attempt == 0 else self._new()
+            try:
+                conn.request("GET", url, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if attempt == 0:
+                    continue
+                raise CpnuApiError("NETWORK", f"{url}: {e}") from e
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._give(conn)
+
+            if resp.status != 200:
+                raise CpnuApiError("HTTP", f"{url}: HTTP {resp.status}")
+            try:
+                return json.loads(body.decode("utf-8"))
+            except ValueError as e:
+                raise CpnuApiError("SCHEMA", f"{url}: respuesta no es JSON") from e
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def _api_date(value: Any) -> str:
+    # "2024-05-10T00:00:00" -> "2024-05-10" (mismo texto que muestra la tabla del SPA)
+    if not value:
+        return ""
+    return str(value)[:10]
+
+
+def _api_text(value: Any) -> str:
+    return "" if value is None else str(value).strip()
+
+
+def _api_int(value: Any, field: str) -> int:
+    # Un entero mal formado es un cambio de esquema: debe caer al fallback del navegador
+    try:
+        return int(value)
+    except (TypeError, ValueError) as e:
+        raise CpnuApiError("SCHEMA", f"'{field}' no es entero: {value!r}") from e
+
+
+def api_row_to_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    # Mismas claves que _extract_actuaciones_rows, así make_hash da el mismo resultado
+    return {
+        "fecha_actuacion": _api_date(item.get("fechaActuacion")),
+        "actuacion": _api_text(item.get("actuacion")),
+        "anotacion": _api_text(item.get("anotacion")),
+        "fecha_inicia_termino": _api_date(item.get("fechaInicial")),
+        "fecha_finaliza_termino": _api_date(item.get("fechaFinal")),
+        "fecha_registro": _api_date(item.get("fechaRegistro")),
+    }
+
+
+class CpnuApiClient:
+    """
+    Cliente directo de los endpoints JSON que usa el SPA de CPNU:
+    consulta por número de radicación y actuaciones paginadas por idProceso.
+    Cualquier error de red, HTTP o de esquema sale como CpnuApiError.
+    """
+
+    def __init__(self, base_url: Optional[str] = None):
+        self._pool = _ConnectionPool(
+            base_url or settings.cpnu_api_url,
+            max_idle=settings.cpnu_api_pool_size,
+            timeout=settings.cpnu_api_timeout_s,
+            verify_ssl=settings.cpnu_api_verify_ssl,
+        )
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def find_proceso(self, radicado: str) -> Tuple[int, Optional[str]]:
+        data = self._pool.get_json(
+            "/Procesos/Consulta/NumeroRadicacion",
+            {"numero": radicado, "SoloActivos": "false", "pagina": 1},
+        )
+        procesos = data.get("procesos") if isinstance(data, dict) else None
+        if not isinstance(procesos, list):
+            raise CpnuApiError("SCHEMA", "Respuesta de consulta sin lista 'procesos'.")
+        if not procesos:
+            raise CpnuApiError("NO_DATA", "La consulta no generó resultados.")
+
+        first = procesos[0]
+        if not isinstance(first, dict) or first.get("idProceso") is None:
+            raise CpnuApiError("SCHEMA", "Proceso sin 'idProceso'.")
+        return _api_int(first["idProceso"], "idProceso"), (_api_date(first.get("fechaUltimaActuacion")) or None)
+
+    def iter_actuaciones(self, id_proceso: int, max_rows: int) -> Iterator[Dict[str, Any]]:
+        # Página a página: quien consume puede cortar sin pedir el resto
+        yielded = 0
+        page = 1
+        while yielded < max_rows:
+            data = self._pool.get_json(f"/Proceso/Actuaciones/{int(id_proceso)}", {"pagina": page})
+            items = data.get("actuaciones") if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                raise CpnuApiError("SCHEMA", "Respuesta de actuaciones sin lista 'actuaciones'.")
+
+            for item in items:
+                if not isinstance(item, dict) or "fechaActuacion" not in item:
+                    raise CpnuApiError("SCHEMA", "Actuación sin 'fechaActuacion'.")
+                yield api_row_to_row(item)
+                yielded += 1
+                if yielded >= max_rows:
+                    return
+
+            pag = data.get("paginacion") or {}
+            if not isinstance(pag, dict):
+                raise CpnuApiError("SCHEMA", "'paginacion' no es un objeto.")
+            total_pages = _api_int(pag.get("cantidadPaginas") or 1, "cantidadPaginas")
+            if not items or page >= total_pages:
+                return
+            page += 1
+
+
+_client: Optional[CpnuApiClient] = None
+_client_lock = threading.Lock()
+
+
+def get_api_client() -> CpnuApiClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = CpnuApiClient()
+        return _client
@@ -1,8 +1,18 @@
+import asyncio
 import re
 import time
-from typing import Any, Dict, List, Tuple, Optional
-from playwright.sync_api import sync_playwright, TimeoutError as PWTimeoutError
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
+from playwright.async_api import TimeoutError as PWTimeoutError
 from .settings import settings
+from .browser_pool import BrowserPool
+from .normalize import parse_cpnu_date
+from .actuacion import Actuacion
+from .selector_cache import selector_cache
+from .resource_policy import RequestStats, merge_stats, resource_policy
+from .cpnu_api import CpnuApiError, get_api_client
+from .adaptive_timeouts import timeouts
 
 CPNU_URL = "https://consultaprocesos.ramajudicial.gov.co/Procesos/NumeroRadicacion"
 LABEL_TODOS = "Todos los Procesos (consulta completa, menos rápida)"
@@ -13,94 +23,178 @@ class CpnuScrapeError(Exception):
         self.code = code
         self.message = message
 
-def _modal_no_results(page) -> bool:
-    try:
-        page.get_by_text(re.compile("La consulta no generó resultados", re.I)).wait_for(timeout=3500)
-        return True
-    except PWTimeoutError:
-        return False
+@dataclass
+class ScrapeResult:
+    rows: List[Actuacion]
+    used_mode: str
+    # True cuando la fila de resultados mostró que no hay nada nuevo (no se abrió el detalle)
+    unchanged: bool = False
+    ultima_actuacion: Optional[str] = None
+    request_stats: Dict[str, int] = field(default_factory=dict)
 
-def _click_consultar(page):
-    btn = page.locator("button.v-btn:has-text('CONSULTAR')").first
-    try:
-        btn.wait_for(timeout=15000)
-        btn.click()
-        return
-    except Exception:
-        pass
+@dataclass(frozen=True)
+class StopCondition:
+    """
+    Indica dónde empiezan las actuaciones ya guardadas. La tabla viene de la
+    más reciente a la más antigua por fecha, pero dentro de un mismo día CPNU
+    no garantiza el orden: con watermark se corta solo por fecha y los rows
+    conocidos del día del watermark se saltan (una nueva puede venir debajo).
+    Sin watermark se corta en el primer row conocido.
+    """
+    radicado: str
+    watermark: Optional[date] = None
+    known_hashes: FrozenSet[str] = field(default_factory=frozenset)
 
-    # fallback role/button
-    try:
-        page.get_by_role("button", name=re.compile("^CONSULTAR$", re.I)).click(timeout=15000)
-        return
-    except Exception:
-        pass
+    def reached(self, row: Actuacion) -> bool:
+        if self.watermark:
+            return bool(row.fecha and row.fecha < self.watermark)
+        return row.hash in self.known_hashes
+
+    def skip(self, row: Actuacion) -> bool:
+        return bool(self.watermark) and row.hash in self.known_hashes
+
+_RE_NO_RESULTS = re.compile("La consulta no generó resultados", re.I)
+_RE_NUMERO_RADICACION = re.compile("Número de Radicación", re.I)
+
+CONSULTAR_STRATEGIES = [
+    ("css_vuetify", lambda page: page.locator("button.v-btn:has-text('CONSULTAR')")),
+    ("role_button", lambda page: page.get_by_role("button", name=re.compile("^CONSULTAR$", re.I))),
+    ("text", lambda page: page.get_by_text(re.compile("^CONSULTAR$", re.I))),
+]
+
+VOLVER_STRATEGIES = [
+    ("css_vuetify", lambda page: page.locator("button.v-btn:has-text('VOLVER')")),
+    ("role_button", lambda page: page.get_by_role("button", name=re.compile("^VOLVER$", re.I))),
+]
 
-    # fallback text
-    page.get_by_text(re.compile("^CONSULTAR$", re.I)).click(timeout=15000)
+FORM_READY_STRATEGIES = [
+    ("text_numero_radicacion", lambda page: page.get_by_text(_RE_NUMERO_RADICACION)),
+    ("placeholder_23_digitos", lambda page: page.get_by_placeholder(re.compile("23 dígitos", re.I))),
+]
 
-def _select_todos(page):
+TAB_ACTUACIONES_STRATEGIES = [
+    ("role_tab", lambda page: page.locator("role=tab[name=/actuaciones/i]")),
+    ("div_tab", lambda page: page.locator("div[role='tab']:has-text('Actuaciones')")),
+    ("button_tab", lambda page: page.locator("button[role='tab']:has-text('Actuaciones')")),
+    ("text_ancestor_tab", lambda page: page.locator("text=Actuaciones >> xpath=./ancestor-or-self::*[@role='tab']")),
+]
+
+async def _modal_no_results(page) -> bool:
+    """
+    Espera el desenlace de CONSULTAR: modal "sin resultados" o tabla de
+    resultados, lo que aparezca primero (sin espera fija por el modal).
+    """
+    # Solo visibles: tras VOLVER el modal de la consulta anterior queda oculto en el DOM
+    modal = page.get_by_text(_RE_NO_RESULTS).filter(visible=True)
+    results = page.get_by_role("columnheader", name=_RE_NUMERO_RADICACION).filter(visible=True)
+    with timeouts.phase("query") as t:
+        await modal.or_(results).first.wait_for(timeout=t)
+    return await modal.count() > 0
+
+async def _click_consultar(page):
+    with timeouts.phase("click") as t:
+        btn = await selector_cache.first(page, "consultar", CONSULTAR_STRATEGIES, timeout=t)
+        await btn.click(timeout=t)
+
+async def _click_volver(page):
+    with timeouts.phase("click") as t:
+        btn = await selector_cache.first(page, "volver", VOLVER_STRATEGIES, timeout=t)
+        await btn.click(timeout=t)
+        await page.get_by_text(_RE_NO_RESULTS).wait_for(state="hidden", timeout=t)
+
+async def _select_todos(page):
     label = page.get_by_text(LABEL_TODOS, exact=True)
-    label.click(timeout=15000)
-    input_id = label.evaluate("el => el.getAttribute('for')")
+    await label.click(timeout=timeouts.get("click"))
+    input_id = await label.evaluate("el => el.getAttribute('for')")
     if input_id:
         inp = page.locator(f"#{input_id}")
-        aria = inp.get_attribute("aria-checked")
-        checked = inp.evaluate("el => el.checked")
+        aria = await inp.get_attribute("aria-checked")
+        checked = await inp.evaluate("el => el.checked")
         if not (checked or aria == "true"):
-            label.click(force=True)
+            await label.click(force=True)
+
+# Fecha de la última actuación según la fila del radicado en la tabla de resultados
+_JS_RESULTS_SUMMARY = """
+({ radicado }) => {
+    const norm = (s) => (s || "").normalize("NFD").replace(/[\\u0300-\\u036f]/g, "")
+        .replace(/\\s+/g, " ").trim().toLowerCase();
+    const table = Array.from(document.querySelectorAll("table")).find((t) =>
+        Array.from(t.querySelectorAll("th")).some((th) => norm(th.innerText).includes("numero de radicacion"))
+    );
+    if (!table) return null;
+    const headers = Array.from(table.querySelectorAll("thead th")).map((th) => norm(th.innerText));
+    const col = headers.findIndex((h) => h.includes("ultima actuacion"));
+    if (col < 0) return null;
+    const tr = Array.from(table.querySelectorAll("tbody tr")).find((r) =>
+        (r.innerText || "").replace(/\\D+/g, "").includes(radicado)
+    );
+    if (!tr) return null;
+    const td = tr.querySelectorAll("td")[col];
+    const dates = ((td && td.innerText) || "").match(/\\d{4}-\\d{2}-\\d{2}/g) || [];
+    return dates.length ? dates[dates.length - 1] : null;
+}
+"""
+
+def _unchanged_since(ultima: Optional[str], probe_watermark: Optional[date]) -> bool:
+    u = parse_cpnu_date(ultima)
+    return bool(probe_watermark and u and u <= probe_watermark)
+
+async def _read_ultima_actuacion(page, radicado: str) -> Optional[str]:
+    try:
+        return await page.evaluate(_JS_RESULTS_SUMMARY, {"radicado": radicado})
+    except Exception:
+        return None
 
-def _click_radicado_in_results(page):
+async def _click_radicado_in_results(page):
     btn = page.locator("table tbody tr button",).filter(has_text=re.compile(r"\d{10,}")).first
-    btn.wait_for(timeout=60000)
-    btn.click(timeout=15000)
+    with timeouts.phase("results") as t:
+        await btn.wait_for(timeout=t)
+    await btn.click(timeout=timeouts.get("click"))
 
-def _click_tab_actuaciones(page):
+async def _click_tab_actuaciones(page):
     try:
-        # Intentar múltiples estrategias
-        selectors = [
-            "role=tab[name=/actuaciones/i]",
-            "div[role='tab']:has-text('Actuaciones')",
-            "button[role='tab']:has-text('Actuaciones')",
-            "text=Actuaciones >> xpath=./ancestor-or-self::*[@role='tab']",
-        ]
-        
-        for selector in selectors:
-            try:
-                tab = page.locator(selector).first
-                tab.wait_for(timeout=5000)
-                tab.click()
-                time.sleep(1)  # Pequeña pausa para que se active la pestaña
-                return
-            except:
-                continue
-        
-        page.locator("[role='tab']", has_text=re.compile("^Actuaciones$", re.I)).first.click(timeout=15000)
+        with timeouts.phase("click") as t:
+            tab = await selector_cache.first(page, "tab_actuaciones", TAB_ACTUACIONES_STRATEGIES, timeout=t)
+            await tab.click()
+            # En lugar de una pausa fija, esperar a que Vuetify marque la pestaña como activa
+            await page.locator(
+                "[role='tab'][aria-selected='true']:has-text('Actuaciones'), .v-tab--active:has-text('Actuaciones')"
+            ).first.wait_for(timeout=t)
     except Exception as e:
         raise CpnuScrapeError("TAB_NOT_FOUND", f"No se pudo hacer clic en la pestaña Actuaciones: {str(e)}")
 
-def _wait_actuaciones_table(page):
+async def _wait_table_rows(page, table, timeout: float):
+    # Un solo presupuesto para ambas esperas
+    start = time.monotonic()
+    await table.wait_for(state="visible", timeout=timeout)
+    remaining = max(1.0, timeout - (time.monotonic() - start) * 1000)
+    # Verificar que haya filas con datos reales (no solo estructura vacía)
+    await page.wait_for_function(
+        """() => {
+            const table = Array.from(document.querySelectorAll('table')).find((t) =>
+                Array.from(t.querySelectorAll('th')).some((th) => /Fecha de Actuaci/i.test(th.textContent))
+            );
+            if (!table) return false;
+            const rows = table.querySelectorAll('tbody tr');
+            if (rows.length === 0) return false;
+            // Verificar que al menos una fila tenga contenido en la primera celda
+            const firstRow = rows[0];
+            const firstCell = firstRow.querySelector('td');
+            return firstCell && firstCell.textContent.trim().length > 0;
+        }""",
+        timeout=remaining,
+    )
+
+async def _wait_actuaciones_table(page):
     try:
-        time.sleep(2)
         table = page.locator("table").filter(
             has=page.locator("th:has-text('Fecha de Actuación')")
-        ).first        
-        table.wait_for(state="visible", timeout=30000)        
-        # Verificar que haya filas con datos reales (no solo estructura vacía)
-        page.wait_for_function(
-            """() => {
-                const rows = document.querySelectorAll('table tbody tr');
-                if (rows.length === 0) return false;
-                // Verificar que al menos una fila tenga contenido en la primera celda
-                const firstRow = rows[0];
-                const firstCell = firstRow.querySelector('td');
-                return firstCell && firstCell.textContent.trim().length > 0;
-            }""",
-            timeout=30000
-        )
-        
+        ).first
+        with timeouts.phase("table") as t:
+            await _wait_table_rows(page, table, t)
+
         return True
-        
+
     except PWTimeoutError as e:
         # Verificar diferentes escenarios de error
         no_results_selectors = [
@@ -111,14 +205,14 @@ def _wait_actuaciones_table(page):
         ]
         
         for selector in no_results_selectors:
-            if page.locator(selector).count() > 0:
+            if await page.locator(selector).count() > 0:
                 raise CpnuScrapeError(
                     "NO_DATA",
                     "La tabla de actuaciones no tiene datos."
                 ) from e
         
         # Verificar si hay tabla pero sin filas
-        if page.locator("table").count() > 0:
+        if await page.locator("table").count() > 0:
             raise CpnuScrapeError(
                 "EMPTY_TABLE",
                 "Se encontró la tabla de actuaciones pero está vacía."
@@ -129,122 +223,291 @@ def _wait_actuaciones_table(page):
             "No se pudo encontrar la tabla de actuaciones después de esperar."
         ) from e
 
-def _extract_actuaciones_rows(page, max_rows: int) -> List[Dict[str, Any]]:
+# Columnas esperadas en la tabla de Actuaciones (clave del row -> encabezado normalizado)
+ACTUACIONES_COLUMNS = [
+    ("fecha_actuacion", "fecha de actuacion"),
+    ("actuacion", "actuacion"),
+    ("anotacion", "anotacion"),
+    ("fecha_inicia_termino", "fecha inicia termino"),
+    ("fecha_finaliza_termino", "fecha finaliza termino"),
+    ("fecha_registro", "fecha de registro"),
+]
+
+# Una ida y vuelta por bloque: encabezados, total de filas y celdas de [start, start+count)
+_JS_EXTRACT_TABLE = """
+({ start, count }) => {
+    const norm = (s) => (s || "").normalize("NFD").replace(/[\\u0300-\\u036f]/g, "")
+        .replace(/\\s+/g, " ").trim().toLowerCase();
+    const table = Array.from(document.querySelectorAll("table")).find((t) =>
+        Array.from(t.querySelectorAll("th")).some((th) => norm(th.innerText) === "fecha de actuacion")
+    );
+    if (!table) return null;
+    const headers = Array.from(table.querySelectorAll("thead th")).map((th) => norm(th.innerText));
+    const all = table.querySelectorAll("tbody tr");
+    const trs = Array.from(all).slice(start, start + count);
+    const rows = trs.map((tr) => Array.from(tr.querySelectorAll("td")).map((td) => (td.innerText || "").trim()));
+    return { headers, total: all.length, rows };
+}
+"""
+
+def _column_index(headers: List[str]) -> Dict[str, int]:
+    idx: Dict[str, int] = {}
+    missing = []
+    for key, label in ACTUACIONES_COLUMNS:
+        if label in headers:
+            idx[key] = headers.index(label)
+        else:
+            missing.append(label)
+    if missing:
+        raise CpnuScrapeError(
+            "UI_SELECTOR",
+            f"Cambió la estructura de la tabla de actuaciones. Faltan columnas {missing}; encabezados: {headers}",
+        )
+    return idx
+
+async def _iter_actuaciones_rows(page, radicado: str, max_rows: int, chunk_rows: int) -> AsyncIterator[Actuacion]:
     """
-    Extrae filas de la tabla en Actuaciones - VERSIÓN CORREGIDA
-    Basado en el HTML proporcionado que muestra 7 columnas
+    Recorre la tabla en Actuaciones por bloques de chunk_rows filas (un evaluate
+    por bloque), así quien consume puede cortar sin leer el resto de la tabla.
+    Valida los encabezados en el primer bloque (detecta cambios de columnas).
     """
+    idx: Optional[Dict[str, int]] = None
+    start = 0
+    chunk_rows = max(1, int(chunk_rows))
+
+    while start < max_rows:
+        try:
+            payload = await page.evaluate(
+                _JS_EXTRACT_TABLE,
+                {"start": start, "count": min(chunk_rows, max_rows - start)},
+            )
+        except Exception as e:
+            raise CpnuScrapeError(
+                "EXTRACTION_ERROR",
+                f"Error al extraer datos de la tabla: {str(e)}"
+            )
+
+        if not payload:
+            raise CpnuScrapeError("TABLE_NOT_FOUND", "No se encontró la tabla de actuaciones al extraer.")
+
+        if idx is None:
+            idx = _column_index(payload.get("headers") or [])
+
+        cells_list = payload.get("rows") or []
+        for cells in cells_list:
+            yield Actuacion.from_row(radicado, {
+                key: (cells[i] if i < len(cells) else "")
+                for key, i in idx.items()
+            })
+
+        start += len(cells_list)
+        if not cells_list or start >= int(payload.get("total") or 0):
+            return
+
+async def _extract_actuaciones_rows(
+    page,
+    radicado: str,
+    max_rows: int,
+    stop: Optional[StopCondition] = None,
+) -> List[Actuacion]:
     rows = []
-    
-    try:
-        # Localizar la tabla específica de actuaciones
-        table = page.locator("table").filter(
-            has=page.locator("th:has-text('Fecha de Actuación')")
-        ).first
-        
-        # Obtener todas las filas del tbody
-        trs = table.locator("tbody tr")
-        
-        count = trs.count()
-        if count == 0:
-            return rows
-        
-        take = min(count, max_rows)
-        
-        for i in range(take):
-            tr = trs.nth(i)
-            tds = tr.locator("td")
-            td_count = tds.count()
-            
-            # Extraer datos de cada columna según la estructura del HTML
-            row = {
-                "fecha_actuacion": tds.nth(0).inner_text().strip() if td_count > 0 else "",
-                "actuacion": tds.nth(1).inner_text().strip() if td_count > 1 else "",
-                "anotacion": tds.nth(2).inner_text().strip() if td_count > 2 else "",
-                "fecha_inicia_termino": tds.nth(3).inner_text().strip() if td_count > 3 else "",
-                "fecha_finaliza_termino": tds.nth(4).inner_text().strip() if td_count > 4 else "",
-                "fecha_registro": tds.nth(5).inner_text().strip() if td_count > 5 else "",
-            }
-            rows.append(row)
-            
-    except Exception as e:
-        raise CpnuScrapeError(
-            "EXTRACTION_ERROR",
-            f"Error al extraer datos de la tabla: {str(e)}"
-        )
-    
+    async for row in _iter_actuaciones_rows(page, radicado, max_rows, settings.extract_chunk_rows):
+        if stop is not None:
+            if stop.reached(row):
+                break
+            if stop.skip(row):
+                continue
+        rows.append(row)
     return rows
 
-def scrape_actuaciones_cpnu(radicado: str) -> Tuple[List[Dict[str, Any]], str]:
+async def _open_form(page):
+    with timeouts.phase("goto") as t:
+        response = await page.goto(CPNU_URL, wait_until="domcontentloaded", timeout=t)
+    if response is not None and response.status in (403, 429):
+        raise CpnuScrapeError("SOFTBLOCK", f"CPNU respondió HTTP {response.status} al cargar la consulta.")
+    if response is not None and response.status >= 500:
+        raise CpnuScrapeError("NETWORK", f"CPNU respondió HTTP {response.status} al cargar la consulta.")
+    # Esperar que la página cargue (título o placeholder, lo que aparezca primero)
+    with timeouts.phase("form_ready") as t:
+        await selector_cache.first(page, "form_ready", FORM_READY_STRATEGIES, timeout=t)
+
+async def _query_radicado(page, radicado: str, mode: str) -> bool:
+    """Consulta el radicado en el modo dado. False si CPNU responde con el modal sin resultados."""
+    if mode == "TODOS":
+        await _select_todos(page)
+    else:
+        # Seleccionar "Actuaciones Recientes" si está disponible
+        try:
+            await page.get_by_role("radio", name=re.compile("Actuaciones Recientes", re.I)).check(timeout=6000)
+        except Exception:
+            pass
+
+    await page.get_by_placeholder(re.compile("23 dígitos", re.I)).fill(radicado)
+    await _click_consultar(page)
+    return not await _modal_no_results(page)
+
+def _no_results_error() -> CpnuScrapeError:
+    return CpnuScrapeError("NO_DATA", "La consulta no generó resultados en ningún modo.")
+
+async def _query_sequential(page, radicado: str, mode: Optional[str]) -> str:
+    if mode == "TODOS":
+        # El radicado ya se conoce como TODOS: sin intento RECIENTES ni modal
+        if not await _query_radicado(page, radicado, "TODOS"):
+            raise _no_results_error()
+        return "TODOS"
+
+    if await _query_radicado(page, radicado, "RECIENTES"):
+        return "RECIENTES"
+
+    await _click_volver(page)
+    if not await _query_radicado(page, radicado, "TODOS"):
+        raise _no_results_error()
+    return "TODOS"
+
+async def _query_hedged(page, radicado: str, stats: List[RequestStats], cache) -> Tuple[Any, str]:
+    """
+    Lanza RECIENTES y TODOS a la vez en dos páginas del mismo contexto y se
+    queda con la primera que muestre la tabla de resultados; la otra se cancela.
+    Devuelve (página ganadora, modo ganador).
+    """
+    other = await page.context.new_page()
+    stats.append(await resource_policy.install(other, cache))
+
+    async def attempt(pg, m: str) -> Tuple[Any, str]:
+        await _open_form(pg)
+        if not await _query_radicado(pg, radicado, m):
+            raise _no_results_error()
+        return pg, m
+
+    tasks = [
+        asyncio.create_task(attempt(page, "RECIENTES")),
+        asyncio.create_task(attempt(other, "TODOS")),
+    ]
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    winner_page, winner_mode = t.result()
+                    loser_page = other if winner_page is page else page
+                    try:
+                        await loser_page.close()
+                    except Exception:
+                        pass
+                    return winner_page, winner_mode
+        # Ninguno llegó a resultados: se reporta el error de TODOS (la consulta completa)
+        raise tasks[1].exception()
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def _scrape_via_api(
+    radicado: str,
+    hash_radicado: str,
+    max_rows: Optional[int],
+    stop: Optional[StopCondition],
+    probe_watermark: Optional[date],
+) -> ScrapeResult:
+    client = get_api_client()
+    id_proceso, ultima = client.find_proceso(radicado)
+    if _unchanged_since(ultima, probe_watermark):
+        return ScrapeResult(rows=[], used_mode="API", unchanged=True, ultima_actuacion=ultima)
+
+    take = settings.check_rows if max_rows is None else max_rows
+    rows = []
+    for item in client.iter_actuaciones(id_proceso, int(take)):
+        row = Actuacion.from_row(hash_radicado, item)
+        if stop is not None:
+            if stop.reached(row):
+                break
+            if stop.skip(row):
+                continue
+        rows.append(row)
+    return ScrapeResult(rows=rows, used_mode="API", ultima_actuacion=ultima)
+
+async def scrape_actuaciones_cpnu_async(
+    radicado: str,
+    pool: Optional[BrowserPool] = None,
+    max_rows: Optional[int] = None,
+    stop: Optional[StopCondition] = None,
+    mode: Optional[str] = None,
+    probe_watermark: Optional[date] = None,
+) -> ScrapeResult:
+    """
+    Con probe_watermark, si la fila de resultados muestra una última actuación
+    <= probe_watermark se devuelve unchanged=True sin abrir el detalle.
+    """
+    # El hash usa el radicado tal como lo tiene la BD; la consulta, solo los dígitos
+    hash_radicado = radicado
     radicado = re.sub(r"\D+", "", radicado or "")
     if len(radicado) != 23:
         raise CpnuScrapeError("BAD_INPUT", "Radicado debe tener 23 dígitos.")
 
-    used_mode = "RECIENTES"
+    if settings.cpnu_source == "API":
+        try:
+            return await asyncio.to_thread(_scrape_via_api, radicado, hash_radicado, max_rows, stop, probe_watermark)
+        except CpnuApiError as e:
+            if e.code == "NO_DATA":
+                raise CpnuScrapeError("NO_DATA", e.message) from e
+            print(f"  [api] radicado={radicado} {e.code}: {e.message} -> se usa el navegador")
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=settings.headless)
-        context = browser.new_context(viewport={"width": 1400, "height": 900})
-        page = context.new_page()
+    # Sin pool compartido se usa uno efímero (un lanzamiento por llamada)
+    if pool is None:
+        async with BrowserPool() as own_pool:
+            return await scrape_actuaciones_cpnu_async(hash_radicado, own_pool, max_rows, stop, mode, probe_watermark)
 
+    async with pool.page() as page:
+        stats = [await resource_policy.install(page, pool.asset_cache)]
         try:
-            page.goto(CPNU_URL, wait_until="domcontentloaded", timeout=60000)
-            
-            # Esperar que la página cargue
-            try:
-                page.get_by_text(re.compile("Número de Radicación", re.I)).wait_for(timeout=60000)
-            except Exception:
-                page.get_by_placeholder(re.compile("23 dígitos", re.I)).wait_for(timeout=60000)
-            
-            # Seleccionar "Actuaciones Recientes" si está disponible
-            try:
-                page.get_by_role("radio", name=re.compile("Actuaciones Recientes", re.I)).check(timeout=6000)
-            except Exception:
-                pass
-            
-            # Ingresar el radicado
-            page.get_by_placeholder(re.compile("23 dígitos", re.I)).fill(radicado)
-            
-            # Hacer clic en Consultar
-            _click_consultar(page)
-            
-            # Verificar si no hay resultados
-            if _modal_no_results(page):
-                try:
-                    page.locator("button.v-btn:has-text('VOLVER')").first.click(timeout=15000)
-                except Exception:
-                    page.get_by_role("button", name=re.compile("^VOLVER$", re.I)).click(timeout=15000)
-
-                used_mode = "TODOS"
-                _select_todos(page)
-                _click_consultar(page)
+            if mode == "HEDGED":
+                page, used_mode = await _query_hedged(page, radicado, stats, pool.asset_cache)
+            else:
+                await _open_form(page)
+                used_mode = await _query_sequential(page, radicado, mode)
             
             # Esperar resultados y hacer clic en el radicado
-            page.get_by_role("columnheader", name=re.compile("Número de Radicación", re.I)).wait_for(timeout=60000)
-            _click_radicado_in_results(page)
+            with timeouts.phase("results") as t:
+                await page.get_by_role("columnheader", name=_RE_NUMERO_RADICACION).wait_for(timeout=t)
+
+            ultima = await _read_ultima_actuacion(page, radicado)
+            if _unchanged_since(ultima, probe_watermark):
+                await pool.save_storage_state(page)
+                return ScrapeResult(
+                    rows=[], used_mode=used_mode, unchanged=True, ultima_actuacion=ultima,
+                    request_stats=merge_stats(stats),
+                )
+
+            await _click_radicado_in_results(page)
             
             # Navegar a la pestaña de Actuaciones
-            page.get_by_role("tab", name=re.compile("^Actuaciones$", re.I)).wait_for(timeout=60000)
-            _click_tab_actuaciones(page)
+            with timeouts.phase("detail_tab") as t:
+                await page.get_by_role("tab", name=re.compile("^Actuaciones$", re.I)).wait_for(timeout=t)
+            await _click_tab_actuaciones(page)
             
             # Esperar y extraer datos de la tabla
-            _wait_actuaciones_table(page)
-            rows = _extract_actuaciones_rows(page, settings.check_rows)
+            await _wait_actuaciones_table(page)
+            take = settings.check_rows if max_rows is None else max_rows
+            rows = await _extract_actuaciones_rows(page, hash_radicado, int(take), stop)
             
-            return rows, used_mode
+            await pool.save_storage_state(page)
+            return ScrapeResult(rows=rows, used_mode=used_mode, ultima_actuacion=ultima, request_stats=merge_stats(stats))
 
-        except CpnuScrapeError:
+        except CpnuScrapeError as e:
+            e.request_stats = merge_stats(stats)
             raise
         except PWTimeoutError as e:
-            raise CpnuScrapeError("TIMEOUT", str(e)) from e
+            err = CpnuScrapeError("TIMEOUT", str(e))
+            err.request_stats = merge_stats(stats)
+            raise err from e
         except Exception as e:
-            raise CpnuScrapeError("ERROR", str(e)) from e
-        finally:
-            try:
-                context.close()
-            except Exception:
-                pass
-            try:
-                browser.close()
-            except Exception:
-                pass
\ No newline at end of file
+            # Errores de red de Chromium (net::ERR_...) cuentan para el circuit breaker
+            err = CpnuScrapeError("NETWORK" if "net::ERR_" in str(e) else "ERROR", str(e))
+            err.request_stats = merge_stats(stats)
+            raise err from e
+
+def scrape_actuaciones_cpnu(radicado: str) -> ScrapeResult:
+    # Envoltura síncrona para uso puntual (scripts, pruebas manuales)
+    return asyncio.run(scrape_actuaciones_cpnu_async(radicado))
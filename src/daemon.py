@@ -0,0 +1,150 @@
+import asyncio
+import signal
+import time
+from typing import Dict, List, Optional
+
+import pymysql
+
+from .settings import settings
+from .db import get_conn, claim_due_processes, prefetch_process_state, reap_stale_runs, seconds_until_next_due
+from .browser_pool import BrowserPool
+from .rate_control import governor
+from .main import bootstrap_control_rows, process_due, flush_held, keep_leases, report, write_status
+from .adaptive_timeouts import timeouts
+from .migrations import warn_pending
+from .known_hashes import known_hashes
+
+
+def _install_signal_handlers(stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Windows: no hay add_signal_handler en el loop
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+
+def _ensure_conn(conn) -> bool:
+    # Conexión larga: MySQL la corta por wait_timeout si queda ociosa. ping(reconnect=True)
+    # reconecta sobre el mismo objeto, así el renovador de leases y los procesos en curso
+    # (que guardan esta misma conexión) siguen usando una válida; nunca se reemplaza.
+    try:
+        conn.ping(reconnect=True)
+        return True
+    except Exception as e:
+        print(f"Conexión MySQL perdida, se reintenta: {e}")
+        return False
+
+
+async def _sleep_or_stop(stop: asyncio.Event) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=max(1, int(settings.daemon_poll_seconds)))
+    except asyncio.TimeoutError:
+        pass
+
+
+def _next_wakeup(conn) -> float:
+    poll = max(1, int(settings.daemon_poll_seconds))
+    try:
+        secs = seconds_until_next_due(conn)
+    except Exception as e:
+        print(f"No se pudo calcular el próximo vencimiento: {e}")
+        return float(poll)
+    if secs is None:
+        return float(poll)
+    return float(min(poll, max(1, secs)))
+
+
+async def run_daemon() -> None:
+    """
+    Worker de larga duración: conexión MySQL y pool de navegadores quedan
+    abiertos entre procesos. Toma trabajo vencido apenas hay cupo en el
+    gobernador y duerme hasta el next_run_at más próximo (o el intervalo de
+    sondeo). Con SIGINT/SIGTERM deja de tomar trabajo y espera a que terminen
+    los procesos en curso antes de salir.
+    """
+    stop = asyncio.Event()
+    _install_signal_handlers(stop)
+
+    conn = get_conn()
+    warn_pending(conn)
+    in_flight: Dict[int, asyncio.Task] = {}
+    held: List[int] = []
+    last_bootstrap = 0.0
+    last_status = time.monotonic()
+    keeper: Optional[asyncio.Task] = None
+
+    print(f"Daemon iniciado (DRY_RUN={settings.dry_run}, POLL={settings.daemon_poll_seconds}s).")
+    try:
+        async with BrowserPool() as pool:
+            keeper = asyncio.create_task(keep_leases(conn, in_flight))
+            try:
+                while not stop.is_set():
+                    # Sin await entre estas escrituras y su commit (ver run_one_process)
+                    if not _ensure_conn(conn):
+                        await _sleep_or_stop(stop)
+                        continue
+
+                    now = time.monotonic()
+                    try:
+                        if now - last_bootstrap >= settings.bootstrap_every_minutes * 60:
+                            bootstrap_control_rows(conn)
+                            reaped = reap_stale_runs(conn)
+                            if reaped:
+                                print(f"Corridas RUNNING abandonadas cerradas: {reaped}")
+                            last_bootstrap = now
+
+                        flush_held(conn, held)
+
+                        room = governor.snapshot()["effective"] - len(in_flight)
+                        if room > 0:
+                            due = claim_due_processes(conn, limit=min(room, settings.batch_size), exclude_ids=in_flight)
+                            prefetch_process_state(conn, due)
+                            known_hashes.warm(conn, due)
+                            conn.commit()
+                            for p in due:
+                                pid = int(p["proceso_id"])
+                                in_flight[pid] = asyncio.create_task(process_due(conn, p, pool, held))
+                    except pymysql.err.MySQLError as e:
+                        # Deadlock, lock wait o conexión caída: se deshace lo de esta vuelta y se reintenta
+                        print(f"Error de BD en el ciclo del daemon, se reintenta: {e}")
+                        try:
+                            conn.rollback()
+                        except Exception:
+                            pass
+                        await _sleep_or_stop(stop)
+                        continue
+
+                    if now - last_status >= settings.daemon_status_seconds:
+                        timeouts.save()
+                        write_status()
+                        last_status = now
+
+                    # Con cupo libre se duerme hasta el próximo vencimiento; lleno, hasta que termine uno
+                    wait_s = _next_wakeup(conn) if len(in_flight) < governor.snapshot()["effective"] else None
+                    waiters = [asyncio.ensure_future(stop.wait())] + list(in_flight.values())
+                    done, _ = await asyncio.wait(waiters, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+                    waiters[0].cancel()
+
+                    for pid, task in list(in_flight.items()):
+                        if task.done():
+                            del in_flight[pid]
+                            exc: Optional[BaseException] = task.exception()
+                            if exc is not None:
+                                print(f"Error no controlado en proceso_id={pid}: {exc}")
+            finally:
+                # Pase lo que pase, el pool no se cierra con procesos en curso
+                if in_flight:
+                    print(f"Deteniendo: esperando {len(in_flight)} procesos en curso...")
+                    await asyncio.gather(*in_flight.values(), return_exceptions=True)
+                    in_flight.clear()
+
+        if _ensure_conn(conn):
+            flush_held(conn, held)
+        report()
+        print("Daemon detenido.")
+    finally:
+        if keeper is not None:
+            keeper.cancel()
+        conn.close()
@@ -1,12 +1,30 @@
-import json
 import random
-from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import pymysql
 from pymysql.cursors import DictCursor
 
 from .settings import settings
+from .normalize import parse_cpnu_date
+from .actuacion import Actuacion
+from .raw_storage import COMPRESSED, decode_raw, encode_actuacion, encode_raw, storage_mode
+
+# lease_until de una fila sin dueño (NOT NULL para que la cola use el índice)
+LEASE_FREE = "1970-01-01 00:00:00"
+
+# Libera el lease solo si sigue siendo nuestro (pudo vencer y tomarlo otro) sin condicionar el
+# resto del UPDATE. MySQL asigna de izquierda a derecha: lease_until se evalúa antes de tocar lease_owner.
+_RELEASE_LEASE_SET = "lease_until=IF(lease_owner=%s, %s, lease_until), lease_owner=IF(lease_owner=%s, NULL, lease_owner)"
+
+
+def _release_lease_params() -> List[Any]:
+    return [settings.worker_id, LEASE_FREE, settings.worker_id]
+
+
+# Deadlock / lock wait timeout: MySQL deshizo la transacción y se puede repetir
+RETRY_ERRNOS = (1205, 1213)
 
 
 def get_conn():
@@ -22,21 +40,80 @@ def get_conn():
     )
 
 
-def ensure_control_row(conn, proceso_id: int) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
+def _execute_retrying(conn, sql: str, args: Any = None, attempts: int = 3) -> int:
+    # Sentencia en su propia transacción, repetida si chocó con otro worker (deadlock / lock wait)
+    for attempt in range(attempts):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql, args)
+                n = int(cur.rowcount)
+            conn.commit()
+            return n
+        except pymysql.err.OperationalError as e:
+            conn.rollback()
+            if not (e.args and e.args[0] in RETRY_ERRNOS) or attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0.1, 0.5) * (attempt + 1))
+    return 0
+
+
+def sync_control_rows(conn, chunk: Optional[int] = None) -> Dict[str, int]:
+    """
+    Bootstrap por conjuntos de vigilancia_control: crea en bloques las filas
+    que faltan para procesos con vigilancia activa y marca activo=0/1 según
+    despacho_ingreso_procesos. Cada bloque se confirma por separado para no
+    sostener locks largos; sin cambios cuesta un par de anti-joins.
+    Varios workers lo corren a la vez: INSERT IGNORE salta la fila que otro
+    acaba de crear y cada bloque se repite si hubo deadlock.
+    """
+    size = max(1, int(chunk if chunk is not None else settings.bootstrap_chunk))
+    created = 0
+    while True:
+        n = _execute_retrying(
+            conn,
             """
-            INSERT INTO vigilancia_control (proceso_id, next_run_at, fail_count)
-            VALUES (%s, NOW(), 0)
-            ON DUPLICATE KEY UPDATE proceso_id = proceso_id
+            INSERT IGNORE INTO vigilancia_control (proceso_id, next_run_at, fail_count, activo)
+            SELECT dip.id, NOW(), 0, 1
+            FROM despacho_ingreso_procesos dip
+            WHERE dip.vigilancia_activa = 1
+              AND NOT EXISTS (SELECT 1 FROM vigilancia_control vc WHERE vc.proceso_id = dip.id)
+            ORDER BY dip.id
+            LIMIT %s
             """,
-            (proceso_id,),
+            (size,),
         )
+        created += n
+        if n < size:
+            break
 
+    deactivated = _execute_retrying(
+        conn,
+        """
+        UPDATE vigilancia_control vc
+        JOIN despacho_ingreso_procesos dip ON dip.id = vc.proceso_id
+        SET vc.activo = 0
+        WHERE vc.activo = 1 AND COALESCE(dip.vigilancia_activa, 0) <> 1
+        """,
+    )
 
-def fetch_due_processes(conn) -> List[Dict[str, Any]]:
-    with conn.cursor() as cur:
-        sql = """
+    # Reactivado: vuelve a la cola de inmediato en vez de esperar su next_run_at viejo
+    reactivated = _execute_retrying(
+        conn,
+        """
+        UPDATE vigilancia_control vc
+        JOIN despacho_ingreso_procesos dip ON dip.id = vc.proceso_id
+        SET vc.activo = 1, vc.next_run_at = NOW(), vc.cooldown_until = NULL
+        WHERE vc.activo = 0 AND dip.vigilancia_activa = 1
+        """,
+    )
+    return {"created": created, "deactivated": deactivated, "reactivated": reactivated}
+
+
+def _due_query(exclude_count: int) -> str:
+    # Sargable sobre idx_vc_due (activo, next_run_at, lease_until): las escrituras
+    # mantienen next_run_at NOT NULL y >= cooldown_until, y lease_until libre = LEASE_FREE
+    exclude_sql = f"AND vc.proceso_id NOT IN ({','.join(['%s'] * exclude_count)})" if exclude_count else ""
+    return f"""
         SELECT
           dip.id AS proceso_id,
           dip.radicado,
@@ -44,17 +121,111 @@ def fetch_due_processes(conn) -> List[Dict[str, Any]]:
           dip.created_at,
           vc.next_run_at,
           vc.cooldown_until,
-          vc.fail_count
-        FROM despacho_ingreso_procesos dip
-        JOIN vigilancia_control vc ON vc.proceso_id = dip.id
-        WHERE dip.vigilancia_activa = 1
-          AND (vc.cooldown_until IS NULL OR vc.cooldown_until <= NOW())
-          AND (vc.next_run_at IS NULL OR vc.next_run_at <= NOW())
-        ORDER BY COALESCE(vc.next_run_at, '1970-01-01') ASC
+          vc.fail_count,
+          vc.preferred_mode,
+          vc.mode_checked_at,
+          vc.last_detail_at,
+          vc.actuaciones_count AS vc_actuaciones_count,
+          vc.last_fecha_actuacion AS vc_last_fecha_actuacion,
+          vc.last_hash AS vc_last_hash
+        FROM vigilancia_control vc
+        JOIN despacho_ingreso_procesos dip ON dip.id = vc.proceso_id
+        WHERE vc.activo = 1
+          AND vc.next_run_at <= NOW()
+          AND vc.lease_until <= NOW()
+          AND dip.vigilancia_activa = 1
+          {exclude_sql}
+        ORDER BY vc.next_run_at ASC
         LIMIT %s
+        FOR UPDATE OF vc SKIP LOCKED
         """
-        cur.execute(sql, (settings.batch_size,))
-        return cur.fetchall()
+
+
+def claim_due_processes(
+    conn,
+    limit: Optional[int] = None,
+    exclude_ids: Iterable[int] = (),
+) -> List[Dict[str, Any]]:
+    """
+    Toma en forma atómica los procesos vencidos para este worker: bloquea las
+    filas con SKIP LOCKED, les pone lease_owner/lease_until y confirma. Un
+    lease vencido (worker caído) vuelve a quedar disponible para cualquiera.
+    SKIP LOCKED: otro worker reclamando a la vez salta las filas que ya tomó.
+    """
+    exclude = [int(x) for x in exclude_ids]
+    with conn.cursor() as cur:
+        cur.execute(
+            _due_query(len(exclude)),
+            (*exclude, int(limit if limit is not None else settings.batch_size)),
+        )
+        rows = cur.fetchall()
+        if rows:
+            ids = [int(r["proceso_id"]) for r in rows]
+            cur.execute(
+                f"""
+                UPDATE vigilancia_control
+                SET lease_owner=%s, lease_until=DATE_ADD(NOW(), INTERVAL %s SECOND)
+                WHERE proceso_id IN ({",".join(["%s"] * len(ids))})
+                """,
+                (settings.worker_id, int(settings.lease_seconds), *ids),
+            )
+    conn.commit()
+    return rows
+
+
+def renew_leases(conn, proceso_ids: Iterable[int]) -> int:
+    ids = [int(x) for x in proceso_ids]
+    if not ids:
+        return 0
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE vigilancia_control
+            SET lease_until=DATE_ADD(NOW(), INTERVAL %s SECOND)
+            WHERE lease_owner=%s AND proceso_id IN ({",".join(["%s"] * len(ids))})
+            """,
+            (int(settings.lease_seconds), settings.worker_id, *ids),
+        )
+        return int(cur.rowcount)
+
+
+def reap_stale_runs(conn) -> int:
+    # Corridas RUNNING de workers caídos: más viejas que un lease y sin lease vigente
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE worker_runs wr
+            JOIN vigilancia_control vc ON vc.proceso_id = wr.proceso_id
+            SET wr.status='ABANDONED',
+                wr.finished_at=NOW(),
+                wr.error_message='Worker sin lease vigente (caído o detenido).'
+            WHERE wr.status='RUNNING'
+              AND wr.started_at < DATE_SUB(NOW(), INTERVAL %s SECOND)
+              AND vc.lease_until <= NOW()
+            """,
+            (int(settings.lease_seconds),),
+        )
+        reaped = int(cur.rowcount)
+    conn.commit()
+    return reaped
+
+
+def seconds_until_next_due(conn) -> Optional[int]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT TIMESTAMPDIFF(SECOND, NOW(), vc.next_run_at) AS s
+            FROM vigilancia_control vc
+            JOIN despacho_ingreso_procesos dip ON dip.id = vc.proceso_id
+            WHERE vc.activo = 1
+              AND vc.lease_until <= NOW()
+              AND dip.vigilancia_activa = 1
+            ORDER BY vc.next_run_at ASC
+            LIMIT 1
+            """
+        )
+        row = cur.fetchone()
+        return int(row["s"]) if row and row["s"] is not None else None
 
 
 def count_actuaciones(conn, proceso_id: int) -> int:
@@ -70,56 +241,372 @@ def count_actuaciones(conn, proceso_id: int) -> int:
         return int(cur.fetchone()["c"])
 
 
-def insert_actuacion_if_new(conn, proceso_id: int, hash_: str, row: Dict[str, Any]) -> bool:
+def prefetch_process_state(conn, rows: List[Dict[str, Any]]) -> None:
+    """
+    Estado de actuaciones de todo el lote. Si vigilancia_control ya tiene las
+    columnas denormalizadas se usan tal cual (lectura por PK); si no (proceso
+    sin backfill), dos consultas agrupadas para los que falten. Agrega a cada
+    fila: actuaciones_count, max_fecha_actuacion y known_hashes.
+    """
+    missing: List[int] = []
+    for row in rows:
+        if row.get("vc_actuaciones_count") is None:
+            missing.append(int(row["proceso_id"]))
+            continue
+        row["actuaciones_count"] = int(row["vc_actuaciones_count"])
+        row["max_fecha_actuacion"] = row.get("vc_last_fecha_actuacion") or None
+        row["known_hashes"] = frozenset([row["vc_last_hash"]]) if row.get("vc_last_hash") else frozenset()
+    if not missing:
+        return
+
+    placeholders = ",".join(["%s"] * len(missing))
+    stats: Dict[int, Dict[str, Any]] = {}
+    hashes: Dict[int, set] = {}
     with conn.cursor() as cur:
-        sql = """
-        INSERT INTO actuaciones_x_proceso
-        (proceso_id, fuente, hash, fecha_actuacion, actuacion, anotacion,
-         fecha_inicia_termino, fecha_finaliza_termino, fecha_registro, raw_row_json)
-        VALUES
-        (%s, 'CPNU', %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        try:
+        cur.execute(
+            f"""
+            SELECT proceso_id, COUNT(*) AS c, MAX(fecha_actuacion) AS m
+            FROM actuaciones_x_proceso
+            WHERE fuente='CPNU' AND proceso_id IN ({placeholders})
+            GROUP BY proceso_id
+            """,
+            missing,
+        )
+        for r in cur.fetchall():
+            stats[int(r["proceso_id"])] = r
+
+        # Hashes del día del watermark, que el corte por fecha solo no distingue
+        cur.execute(
+            f"""
+            SELECT a.proceso_id, a.hash
+            FROM actuaciones_x_proceso a
+            JOIN (
+              SELECT proceso_id, MAX(fecha_actuacion) AS m
+              FROM actuaciones_x_proceso
+              WHERE fuente='CPNU' AND proceso_id IN ({placeholders})
+              GROUP BY proceso_id
+            ) w ON w.proceso_id = a.proceso_id AND a.fecha_actuacion = w.m
+            WHERE a.fuente='CPNU'
+            """,
+            missing,
+        )
+        for r in cur.fetchall():
+            hashes.setdefault(int(r["proceso_id"]), set()).add(r["hash"])
+
+    wanted = set(missing)
+    for row in rows:
+        pid = int(row["proceso_id"])
+        if pid not in wanted:
+            continue
+        st = stats.get(pid) or {}
+        row["actuaciones_count"] = int(st.get("c") or 0)
+        row["max_fecha_actuacion"] = st.get("m") or None
+        row["known_hashes"] = frozenset(hashes.get(pid, ()))
+
+
+def _control_id_chunks(conn, chunk: int) -> Iterable[List[int]]:
+    last = 0
+    while True:
+        with conn.cursor() as cur:
             cur.execute(
-                sql,
-                (
-                    proceso_id,
-                    hash_,
-                    row.get("fecha_actuacion"),
-                    row.get("actuacion"),
-                    row.get("anotacion"),
-                    row.get("fecha_inicia_termino"),
-                    row.get("fecha_finaliza_termino"),
-                    row.get("fecha_registro"),
-                    json.dumps(row, ensure_ascii=False),
-                ),
+                "SELECT proceso_id FROM vigilancia_control WHERE proceso_id > %s ORDER BY proceso_id LIMIT %s",
+                (last, chunk),
+            )
+            ids = [int(r["proceso_id"]) for r in cur.fetchall()]
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def backfill_actuaciones_state(conn, chunk: Optional[int] = None) -> int:
+    """Recalcula count/última fecha/último hash desde actuaciones_x_proceso, por bloques de proceso_id."""
+    size = max(1, int(chunk if chunk is not None else settings.bootstrap_chunk))
+    updated = 0
+    for ids in _control_id_chunks(conn, size):
+        placeholders = ",".join(["%s"] * len(ids))
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                UPDATE vigilancia_control vc
+                LEFT JOIN (
+                  SELECT proceso_id, COUNT(*) AS c, MAX(fecha_actuacion) AS m
+                  FROM actuaciones_x_proceso
+                  WHERE fuente='CPNU' AND proceso_id IN ({placeholders})
+                  GROUP BY proceso_id
+                ) agg ON agg.proceso_id = vc.proceso_id
+                SET vc.actuaciones_count = COALESCE(agg.c, 0),
+                    vc.last_fecha_actuacion = agg.m,
+                    vc.last_hash = (
+                      SELECT a.hash FROM actuaciones_x_proceso a
+                      WHERE a.proceso_id = vc.proceso_id AND a.fuente='CPNU' AND a.fecha_actuacion = agg.m
+                      ORDER BY a.hash
+                      LIMIT 1
+                    )
+                WHERE vc.proceso_id IN ({placeholders})
+                """,
+                (*ids, *ids),
+            )
+            updated += int(cur.rowcount)
+        conn.commit()
+    return updated
+
+
+def check_actuaciones_state(conn, chunk: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Compara las columnas denormalizadas con actuaciones_x_proceso. Devuelve
+    cuántos procesos no tienen backfill y la lista de inconsistentes.
+    """
+    size = max(1, int(chunk if chunk is not None else settings.bootstrap_chunk))
+    pending = 0
+    mismatches: List[Dict[str, Any]] = []
+    for ids in _control_id_chunks(conn, size):
+        placeholders = ",".join(["%s"] * len(ids))
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT vc.proceso_id,
+                       vc.actuaciones_count, COALESCE(agg.c, 0) AS real_count,
+                       vc.last_fecha_actuacion, agg.m AS real_last_fecha,
+                       vc.last_hash
+                FROM vigilancia_control vc
+                LEFT JOIN (
+                  SELECT proceso_id, COUNT(*) AS c, MAX(fecha_actuacion) AS m
+                  FROM actuaciones_x_proceso
+                  WHERE fuente='CPNU' AND proceso_id IN ({placeholders})
+                  GROUP BY proceso_id
+                ) agg ON agg.proceso_id = vc.proceso_id
+                WHERE vc.proceso_id IN ({placeholders})
+                  AND vc.actuaciones_count IS NOT NULL
+                  AND (
+                    vc.actuaciones_count <> COALESCE(agg.c, 0)
+                    OR NOT (vc.last_fecha_actuacion <=> agg.m)
+                    OR (vc.last_hash IS NOT NULL AND NOT EXISTS (
+                      SELECT 1 FROM actuaciones_x_proceso a
+                      WHERE a.proceso_id = vc.proceso_id AND a.fuente='CPNU'
+                        AND a.hash = vc.last_hash AND a.fecha_actuacion = vc.last_fecha_actuacion
+                    ))
+                  )
+                """,
+                (*ids, *ids),
             )
-            return True
-        except pymysql.err.IntegrityError:
-            return False
+            mismatches.extend(cur.fetchall())
+            cur.execute(
+                f"SELECT COUNT(*) AS c FROM vigilancia_control WHERE actuaciones_count IS NULL AND proceso_id IN ({placeholders})",
+                ids,
+            )
+            pending += int(cur.fetchone()["c"])
+        conn.commit()
+    return {"pending_backfill": pending, "mismatches": mismatches}
+
+
+def _actuacion_values(row: Actuacion, raw_json: Optional[str]) -> Tuple[Any, ...]:
+    # Columnas DATE tipadas; raw_row_json según RAW_STORAGE_MODE (ver raw_storage.py)
+    return (
+        row.fecha,
+        row.actuacion,
+        row.anotacion,
+        row.fecha_inicia,
+        row.fecha_finaliza,
+        row.fecha_reg,
+        raw_json,
+    )
+
+
+def _insert_raw_payloads(cur, payloads: List[Tuple[str, bytes]]) -> None:
+    cur.executemany(
+        "INSERT IGNORE INTO actuaciones_raw (hash, payload) VALUES (%s, %s)",
+        payloads,
+    )
+
+
+def existing_hashes(conn, proceso_id: int, hashes: List[str]) -> set:
+    found: set = set()
+    with conn.cursor() as cur:
+        for i in range(0, len(hashes), 1000):
+            part = hashes[i : i + 1000]
+            cur.execute(
+                f"""
+                SELECT hash FROM actuaciones_x_proceso
+                WHERE proceso_id=%s AND fuente='CPNU' AND hash IN ({",".join(["%s"] * len(part))})
+                """,
+                (proceso_id, *part),
+            )
+            found.update(r["hash"] for r in cur.fetchall())
+    return found
+
+
+def load_known_hashes(conn, proceso_ids: List[int]) -> Dict[int, List[str]]:
+    out: Dict[int, List[str]] = {}
+    ids = [int(x) for x in proceso_ids]
+    with conn.cursor() as cur:
+        for i in range(0, len(ids), 500):
+            part = ids[i : i + 500]
+            cur.execute(
+                f"""
+                SELECT proceso_id, hash FROM actuaciones_x_proceso
+                WHERE fuente='CPNU' AND proceso_id IN ({",".join(["%s"] * len(part))})
+                """,
+                part,
+            )
+            for r in cur.fetchall():
+                out.setdefault(int(r["proceso_id"]), []).append(r["hash"])
+    return out
 
 
 def insert_actuaciones_batch(
     conn,
     proceso_id: int,
-    rows_with_hash: List[Tuple[str, Dict[str, Any]]],
+    rows: List[Actuacion],
+    known: Any = None,
 ) -> Tuple[int, List[str]]:
-    inserted_hashes: List[str] = []
-    inserted_count = 0
+    """
+    Inserta las actuaciones nuevas en un solo INSERT IGNORE multi-fila.
+    Los hashes nuevos salen de un pre-chequeo con IN (...); con el lease del
+    proceso nadie más escribe sus actuaciones entre el chequeo y el insert.
+    Con `known` (índice de hashes del proceso, ver known_hashes.py) solo van
+    al pre-chequeo los que el índice no puede decidir; si el índice resulta
+    desfasado (dio por nuevo algo que ya estaba) el insert se deshace hasta
+    un savepoint y se repite con el pre-chequeo completo.
+    """
+    pending: Dict[str, Actuacion] = {}
+    for row in rows:
+        pending.setdefault(row.hash, row)
+    if not pending:
+        return 0, []
+
+    decided: Dict[str, bool] = {}
+    if known is not None:
+        for h in pending:
+            c = known.classify(h)
+            if c is not None:
+                decided[h] = c
+    to_check = [h for h in pending if h not in decided]
+    found = existing_hashes(conn, proceso_id, to_check) if to_check else set()
+    new_rows = [
+        (h, r) for h, r in pending.items()
+        if (decided[h] is False if h in decided else h not in found)
+    ]
+    if not new_rows:
+        return 0, []
+
+    encoded = [(h, r, *encode_actuacion(r)) for h, r in new_rows]
+    with conn.cursor() as cur:
+        if decided:
+            cur.execute("SAVEPOINT axp_batch")
+        # pymysql agrupa executemany en sentencias multi-fila solo si VALUES lleva puros %s
+        cur.executemany(
+            """
+            INSERT IGNORE INTO actuaciones_x_proceso
+            (proceso_id, fuente, hash, fecha_actuacion, actuacion, anotacion,
+             fecha_inicia_termino, fecha_finaliza_termino, fecha_registro, raw_row_json)
+            VALUES
+            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [(proceso_id, "CPNU", h, *_actuacion_values(r, raw_json)) for h, r, raw_json, _ in encoded],
+        )
+        if decided and cur.rowcount != len(new_rows):
+            # El índice en memoria dio por nuevo algo que ya estaba: no se sabe cuáles, se decide con la BD
+            cur.execute("ROLLBACK TO SAVEPOINT axp_batch")
+            print(
+                f"proceso_id={proceso_id}: índice de hashes desfasado "
+                f"({len(new_rows) - cur.rowcount} ya existían), se repite con pre-chequeo."
+            )
+            return insert_actuaciones_batch(conn, proceso_id, rows)
+        payloads = [(h, payload) for h, _, _, payload in encoded if payload is not None]
+        if payloads:
+            _insert_raw_payloads(cur, payloads)
 
-    for hash_, row in rows_with_hash:
-        if insert_actuacion_if_new(conn, proceso_id, hash_, row):
-            inserted_count += 1
-            inserted_hashes.append(hash_)
+    inserted_hashes = [h for h, _ in new_rows]
+    return len(inserted_hashes), inserted_hashes
 
-    return inserted_count, inserted_hashes
+
+_RAW_SELECT = """
+    SELECT a.id, a.hash, a.fecha_actuacion, a.actuacion, a.anotacion,
+           a.fecha_inicia_termino, a.fecha_finaliza_termino, a.fecha_registro,
+           a.raw_row_json, r.payload
+    FROM actuaciones_x_proceso a
+    LEFT JOIN actuaciones_raw r ON r.hash = a.hash
+"""
+
+
+def load_raw_row(conn, proceso_id: int, hash_: str) -> Optional[Dict[str, str]]:
+    """JSON original de una actuación, sin importar el RAW_STORAGE_MODE con que se guardó."""
+    with conn.cursor() as cur:
+        cur.execute(
+            _RAW_SELECT + " WHERE a.proceso_id=%s AND a.fuente='CPNU' AND a.hash=%s",
+            (proceso_id, hash_),
+        )
+        row = cur.fetchone()
+    if not row:
+        return None
+    return decode_raw(row, row.get("payload"))
+
+
+def migrate_raw_storage(conn, chunk: Optional[int] = None) -> int:
+    """
+    Reescribe raw_row_json / actuaciones_raw de las filas existentes al
+    RAW_STORAGE_MODE actual, por bloques de id (commit por bloque). Un
+    payload solo se borra cuando ninguna fila posterior lo sigue usando; la
+    última que lo comparte lo borra al migrarse.
+    """
+    mode = storage_mode()
+    size = max(1, int(chunk if chunk is not None else settings.bootstrap_chunk))
+    last = 0
+    changed = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(_RAW_SELECT + " WHERE a.id > %s ORDER BY a.id LIMIT %s", (last, size))
+            rows = cur.fetchall()
+            if not rows:
+                return changed
+            last = int(rows[-1]["id"])
+
+            updates: List[Tuple[Optional[str], int]] = []
+            payloads: List[Tuple[str, bytes]] = []
+            drop: List[str] = []
+            for row in rows:
+                if mode == COMPRESSED and row.get("payload") and row.get("raw_row_json") is None:
+                    continue
+                raw_json, payload = encode_raw(decode_raw(row, row.get("payload")), mode)
+                if payload is None and not row.get("payload") and raw_json == row.get("raw_row_json"):
+                    continue
+                updates.append((raw_json, int(row["id"])))
+                if payload is not None:
+                    payloads.append((row["hash"], payload))
+                elif row.get("payload"):
+                    drop.append(row["hash"])
+
+            if payloads:
+                cur.executemany(
+                    "INSERT INTO actuaciones_raw (hash, payload) VALUES (%s, %s) "
+                    "ON DUPLICATE KEY UPDATE payload=VALUES(payload)",
+                    payloads,
+                )
+            if updates:
+                cur.executemany("UPDATE actuaciones_x_proceso SET raw_row_json=%s WHERE id=%s", updates)
+            if drop:
+                # El payload es por hash y puede compartirlo otra fila (otro proceso_id) aún sin migrar
+                cur.execute(
+                    f"""
+                    DELETE r FROM actuaciones_raw r
+                    WHERE r.hash IN ({','.join(['%s'] * len(drop))})
+                      AND NOT EXISTS (
+                        SELECT 1 FROM actuaciones_x_proceso a
+                        WHERE a.hash = r.hash AND a.id > %s AND a.raw_row_json IS NULL
+                      )
+                    """,
+                    (*drop, last),
+                )
+            changed += len(updates)
+        conn.commit()
 
 
 def insert_worker_run_start(conn, proceso_id: int, fuente: str = "CPNU") -> int:
     with conn.cursor() as cur:
         cur.execute(
-            "INSERT INTO worker_runs (proceso_id, fuente, status) VALUES (%s, %s, %s)",
-            (proceso_id, fuente, "RUNNING"),
+            "INSERT INTO worker_runs (proceso_id, fuente, status, worker_id) VALUES (%s, %s, %s, %s)",
+            (proceso_id, fuente, "RUNNING", settings.worker_id),
         )
         return int(cur.lastrowid)
 
@@ -135,7 +622,9 @@ def update_worker_run_finish(
     error_message: Optional[str],
     screenshot_path: Optional[str],
     html_path: Optional[str],
+    request_stats: Optional[Dict[str, int]] = None,
 ) -> None:
+    rs = request_stats or {}
     with conn.cursor() as cur:
         cur.execute(
             """
@@ -148,7 +637,11 @@ def update_worker_run_finish(
                 notified=%s,
                 error_message=%s,
                 artifact_screenshot_path=%s,
-                artifact_html_path=%s
+                artifact_html_path=%s,
+                req_allowed=%s,
+                req_blocked=%s,
+                bytes_allowed=%s,
+                req_cached=%s
             WHERE id=%s
             """,
             (
@@ -160,6 +653,10 @@ def update_worker_run_finish(
                 error_message,
                 screenshot_path,
                 html_path,
+                rs.get("allowed"),
+                rs.get("blocked"),
+                rs.get("bytes_allowed"),
+                rs.get("cached"),
                 run_id,
             ),
         )
@@ -199,24 +696,74 @@ def compute_backoff_minutes(fail_count: int, error_code: str) -> int:
     return 360
 
 
-def update_scheduler_success(conn, proceso_id: int) -> None:
+def update_scheduler_success(
+    conn,
+    proceso_id: int,
+    actuaciones_state: Optional[Tuple[int, Optional[date], Optional[str]]] = None,
+    preferred_mode: Optional[str] = None,
+    mode_validated: bool = False,
+    detail_checked: bool = False,
+) -> None:
+    """
+    Una sola escritura de la fila de control al terminar bien: programación,
+    estado de actuaciones (count, última fecha, último hash; valores absolutos,
+    con el lease nadie más escribe las actuaciones del proceso), modo de
+    consulta (mode_validated cuando salió del flujo completo RECIENTES -> TODOS),
+    lectura del detalle y liberación del lease si sigue siendo nuestro.
+    """
     jitter = random.randint(0, 7)
     interval = int(getattr(settings, "interval_minutes", 60)) + jitter
 
+    sets = [
+        "last_run_at=NOW()",
+        "last_success_at=NOW()",
+        "fail_count=0",
+        "cooldown_until=NULL",
+        "last_error_code=NULL",
+        "last_error_message=NULL",
+        "next_run_at=DATE_ADD(NOW(), INTERVAL %s MINUTE)",
+    ]
+    params: List[Any] = [interval]
+    if actuaciones_state is not None:
+        count, last_fecha, last_hash = actuaciones_state
+        sets += ["actuaciones_count=%s", "last_fecha_actuacion=%s", "last_hash=COALESCE(%s, last_hash)"]
+        params += [int(count), last_fecha, last_hash]
+    if preferred_mode:
+        sets.append("preferred_mode=%s")
+        params.append(preferred_mode)
+        if mode_validated:
+            sets.append("mode_checked_at=NOW()")
+    if detail_checked:
+        sets.append("last_detail_at=NOW()")
+    sets.append(_RELEASE_LEASE_SET)
+    params += _release_lease_params()
+
     with conn.cursor() as cur:
         cur.execute(
-            """
+            f"UPDATE vigilancia_control SET {', '.join(sets)} WHERE proceso_id=%s",
+            (*params, proceso_id),
+        )
+
+
+def reschedule_processes(conn, proceso_ids: List[int], minutes: int) -> None:
+    # Posterga sin tocar fail_count / last_error (p. ej. circuit breaker abierto)
+    if not proceso_ids:
+        return
+    placeholders = ",".join(["%s"] * len(proceso_ids))
+    with conn.cursor() as cur:
+        # Jitter por fila para que no vuelvan todos en el mismo segundo
+        cur.execute(
+            f"""
             UPDATE vigilancia_control
-            SET last_run_at=NOW(),
-                last_success_at=NOW(),
-                fail_count=0,
-                cooldown_until=NULL,
-                last_error_code=NULL,
-                last_error_message=NULL,
-                next_run_at=DATE_ADD(NOW(), INTERVAL %s MINUTE)
-            WHERE proceso_id=%s
+            SET next_run_at=GREATEST(
+                  DATE_ADD(NOW(), INTERVAL (%s * 60 + FLOOR(RAND() * 300)) SECOND),
+                  COALESCE(cooldown_until, NOW())
+                ),
+                lease_owner=NULL,
+                lease_until=%s
+            WHERE proceso_id IN ({placeholders}) AND (lease_owner IS NULL OR lease_owner=%s)
             """,
-            (interval, proceso_id),
+            (int(minutes), LEASE_FREE, *[int(pid) for pid in proceso_ids], settings.worker_id),
         )
 
 
@@ -238,17 +785,18 @@ def update_scheduler_failure(
 
     with conn.cursor() as cur:
         cur.execute(
-            """
+            f"""
             UPDATE vigilancia_control
             SET last_run_at=NOW(),
                 fail_count=%s,
                 last_error_code=%s,
                 last_error_message=%s,
                 cooldown_until=DATE_ADD(NOW(), INTERVAL %s MINUTE),
-                next_run_at=DATE_ADD(NOW(), INTERVAL %s MINUTE)
+                next_run_at=DATE_ADD(NOW(), INTERVAL %s MINUTE),
+                {_RELEASE_LEASE_SET}
             WHERE proceso_id=%s
             """,
-            (new_fail, error_code, msg, backoff_total, backoff_total, proceso_id),
+            (new_fail, error_code, msg, backoff_total, backoff_total, *_release_lease_params(), proceso_id),
         )
 
 
@@ -265,7 +813,7 @@ def parse_created_at(value: Any) -> Optional[datetime]:
                 continue
     return None
 
-def get_max_fecha_actuacion(conn, proceso_id: int) -> Optional[str]:
+def get_max_fecha_actuacion(conn, proceso_id: int) -> Optional[date]:
     with conn.cursor() as cur:
         cur.execute(
             """
@@ -276,4 +824,4 @@ def get_max_fecha_actuacion(conn, proceso_id: int) -> Optional[str]:
             (proceso_id,),
         )
         row = cur.fetchone()
-        return row["m"] if row and row["m"] else None
+        return parse_cpnu_date(row["m"]) if row and row["m"] else None
@@ -0,0 +1,42 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+@contextmanager
+def atomic_path(path: str) -> Iterator[str]:
+    """
+    Ruta temporal junto a `path` para escribir el archivo completo; al salir
+    sin error reemplaza a `path` de una vez (os.replace), así un lector u otro
+    worker nunca ve un archivo a medias. Si falla, se borra el temporal.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    with atomic_path(path) as tmp:
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+
+def save_json(path: str, data: Any, **dump_kwargs: Any) -> None:
+    # Estado/monitoreo de mejor esfuerzo: sin ruta configurada o sin disco no se hace nada
+    if not path:
+        return
+    try:
+        with atomic_path(path) as tmp:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, **dump_kwargs)
+    except OSError:
+        pass
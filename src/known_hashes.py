@@ -0,0 +1,146 @@
+import math
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from .settings import settings
+from .db import load_known_hashes
+
+
+class BloomFilter:
+    """Bloom filter sobre hashes sha1 hex (las posiciones salen del propio hash, sin re-hashear)."""
+
+    __slots__ = ("size", "k", "bits")
+
+    def __init__(self, capacity: int, fp_rate: float):
+        n = max(1, int(capacity))
+        p = min(0.5, max(1e-6, float(fp_rate)))
+        self.size = max(8, int(math.ceil(-n * math.log(p) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.size / n * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, h: str) -> Iterable[int]:
+        a = int(h[:16], 16)
+        b = int(h[16:32], 16) | 1
+        for i in range(self.k):
+            yield (a + i * b) % self.size
+
+    def add(self, h: str) -> None:
+        for pos in self._positions(h):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, h: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(h))
+
+
+class ProcessHashIndex:
+    """
+    Hashes ya guardados de un proceso: set exacto mientras sea chico, Bloom
+    filter cuando pasa de exact_max. `count` sigue a actuaciones_count para
+    saber si el índice sigue al día con la BD.
+    """
+
+    __slots__ = ("count", "exact_max", "fp_rate", "_exact", "_bloom")
+
+    def __init__(self, hashes: List[str], exact_max: int, fp_rate: float):
+        self.count = len(hashes)
+        self.exact_max = exact_max
+        self.fp_rate = fp_rate
+        self._exact: Optional[set] = set(hashes)
+        self._bloom: Optional[BloomFilter] = None
+        if len(self._exact) > exact_max:
+            self._to_bloom()
+
+    def _to_bloom(self) -> None:
+        exact = self._exact or set()
+        self._bloom = BloomFilter(max(2 * len(exact), 2 * self.exact_max), self.fp_rate)
+        for h in exact:
+            self._bloom.add(h)
+        self._exact = None
+
+    def classify(self, h: str) -> Optional[bool]:
+        """True = ya guardado, False = nuevo, None = quizá (positivo de Bloom: lo decide la BD)."""
+        if self._exact is not None:
+            return h in self._exact
+        return None if h in self._bloom else False
+
+    def add(self, hashes: Iterable[str]) -> None:
+        for h in hashes:
+            self.count += 1
+            if self._exact is not None:
+                self._exact.add(h)
+            else:
+                self._bloom.add(h)
+        if self._exact is not None and len(self._exact) > self.exact_max:
+            self._to_bloom()
+
+    @property
+    def is_exact(self) -> bool:
+        return self._exact is not None
+
+
+class KnownHashCache:
+    """
+    Índices de hashes conocidos por proceso_id con tope LRU. Se calientan
+    desde actuaciones_x_proceso para los procesos del lote cuyo índice falta
+    o no coincide con actuaciones_count (otro worker escribió entretanto).
+    Solo lo calienta el daemon: entre corridas cron el índice no sobrevive.
+    """
+
+    def __init__(
+        self,
+        max_processes: Optional[int] = None,
+        exact_max: Optional[int] = None,
+        fp_rate: Optional[float] = None,
+    ):
+        self.enabled = settings.known_hash_cache
+        self.max_processes = max(1, int(max_processes if max_processes is not None else settings.known_hash_max_processes))
+        self.exact_max = max(1, int(exact_max if exact_max is not None else settings.known_hash_exact_max))
+        self.fp_rate = float(fp_rate if fp_rate is not None else settings.known_hash_bloom_fp)
+        self._lru: "OrderedDict[int, ProcessHashIndex]" = OrderedDict()
+        self.warmed = 0
+
+    def get(self, proceso_id: int) -> Optional[ProcessHashIndex]:
+        index = self._lru.get(int(proceso_id))
+        if index is not None:
+            self._lru.move_to_end(int(proceso_id))
+        return index
+
+    def put(self, proceso_id: int, hashes: List[str]) -> ProcessHashIndex:
+        index = ProcessHashIndex(hashes, self.exact_max, self.fp_rate)
+        self._lru[int(proceso_id)] = index
+        self._lru.move_to_end(int(proceso_id))
+        while len(self._lru) > self.max_processes:
+            self._lru.popitem(last=False)
+        return index
+
+    def drop(self, proceso_id: int) -> None:
+        self._lru.pop(int(proceso_id), None)
+
+    def warm(self, conn, rows: List[Dict[str, Any]]) -> None:
+        # Requiere actuaciones_count en las filas (prefetch_process_state)
+        if not self.enabled:
+            return
+        stale = []
+        for row in rows:
+            pid = int(row["proceso_id"])
+            index = self._lru.get(pid)
+            if index is None or index.count != int(row.get("actuaciones_count") or 0):
+                stale.append(pid)
+        if not stale:
+            return
+        loaded = load_known_hashes(conn, stale)
+        for pid in stale:
+            self.put(pid, loaded.get(pid, []))
+        self.warmed += len(stale)
+
+    def snapshot(self) -> Dict[str, Any]:
+        exact = sum(1 for i in self._lru.values() if i.is_exact)
+        return {
+            "processes": len(self._lru),
+            "exact": exact,
+            "bloom": len(self._lru) - exact,
+            "warmed": self.warmed,
+        }
+
+
+known_hashes = KnownHashCache()
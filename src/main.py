@@ -1,24 +1,43 @@
+import argparse
+import asyncio
 import os
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from .settings import settings
+from .fsutil import save_json
 from .db import (
     get_conn,
-    ensure_control_row,
-    fetch_due_processes,
+    sync_control_rows,
+    claim_due_processes,
+    renew_leases,
+    reap_stale_runs,
+    prefetch_process_state,
+    backfill_actuaciones_state,
+    check_actuaciones_state,
+    migrate_raw_storage,
     count_actuaciones,
-    insert_actuacion_if_new,
     insert_actuaciones_batch,
     insert_worker_run_start,
     update_worker_run_finish,
     update_scheduler_success,
     update_scheduler_failure,
+    reschedule_processes,
     parse_created_at,
     get_max_fecha_actuacion,
 )
-from .cpnu_scraper import scrape_actuaciones_cpnu, CpnuScrapeError
-from .normalize import make_hash
+from .cpnu_scraper import scrape_actuaciones_cpnu_async, CpnuScrapeError, StopCondition
+from .browser_pool import BrowserPool
+from .selector_cache import selector_cache
+from .adaptive_timeouts import timeouts
+from .circuit_breaker import breaker
+from .rate_control import governor
+from .normalize import parse_cpnu_date
+from .actuacion import Actuacion
+from .known_hashes import known_hashes
+from .raw_storage import storage_mode
+from .migrations import apply_migrations, warn_pending
 
 ART_SCREEN_DIR = os.path.join("artifacts", "screenshots")
 ART_HTML_DIR = os.path.join("artifacts", "html")
@@ -38,12 +57,53 @@ def decide_notified(is_momento0: bool, notify_first: bool, created_at: Optional[
     return 1
 
 
-def run_one_process(conn, p: Dict[str, Any]) -> None:
+def choose_query_mode(preferred_mode: Optional[str], mode_checked_at: Optional[datetime]) -> Optional[str]:
+    # Sin historial -> RECIENTES y TODOS en paralelo (HEDGED_QUERIES)
+    if not preferred_mode and settings.hedged_queries:
+        return "HEDGED"
+    # TODOS conocido y validado hace poco -> directo; si no, flujo completo (revalida)
+    if preferred_mode != "TODOS" or not mode_checked_at:
+        return None
+    if (datetime.now() - mode_checked_at) > timedelta(days=settings.mode_revalidate_days):
+        return None
+    return "TODOS"
+
+
+def compute_probe_watermark(watermark: Optional[date], last_detail_at: Optional[datetime]) -> Optional[date]:
+    # La fila de resultados sólo prueba "sin cambios" si el último detalle se leyó
+    # después de terminado el día del watermark y no hace más de PROBE_FULL_EVERY_HOURS.
+    if not settings.probe_results or not watermark or not last_detail_at:
+        return None
+    if (datetime.now() - last_detail_at) > timedelta(hours=settings.probe_full_every_hours):
+        return None
+    if last_detail_at.date() <= watermark:
+        return None
+    return watermark
+
+
+def newest_actuacion(
+    rows: List[Actuacion],
+    new_hashes: List[str],
+    watermark: Optional[date],
+) -> Tuple[Optional[date], Optional[str]]:
+    # La tabla viene de la más reciente a la más antigua: ante empate gana la primera
+    new = set(new_hashes)
+    last_fecha, last_hash = watermark, None
+    for r in rows:
+        if r.hash in new and r.fecha and (last_fecha is None or r.fecha > last_fecha):
+            last_fecha, last_hash = r.fecha, r.hash
+    return last_fecha, last_hash
+
+
+async def run_one_process(conn, p: Dict[str, Any], pool: Optional[BrowserPool] = None) -> str:
+    """Procesa un radicado y devuelve el status con que quedó la corrida en worker_runs."""
     proceso_id = int(p["proceso_id"])
     radicado = str(p["radicado"])
     notify_first = int(p.get("notify_first_actuation") or 0) == 1
     created_at = parse_created_at(p.get("created_at"))
     fail_count = int(p.get("fail_count") or 0)
+    query_mode = choose_query_mode(p.get("preferred_mode"), parse_created_at(p.get("mode_checked_at")))
+    last_detail_at = parse_created_at(p.get("last_detail_at"))
 
     run_id = insert_worker_run_start(conn, proceso_id, "CPNU")
     conn.commit()
@@ -56,46 +116,48 @@ def run_one_process(conn, p: Dict[str, Any]) -> None:
     html_path = None
 
     try:
-        rows, used_mode = scrape_actuaciones_cpnu(radicado)
-        rows_extracted = len(rows)
-
-        existing = count_actuaciones(conn, proceso_id)
+        # El lote trae el estado precargado (prefetch_process_state); si no, se consulta aquí
+        prefetched = "actuaciones_count" in p
+        existing = int(p["actuaciones_count"]) if prefetched else count_actuaciones(conn, proceso_id)
         is_momento0 = existing == 0
 
+        probe_watermark = None
+        max_db = None
         if is_momento0:
-            rows_to_process = rows[: int(settings.baseline_rows)]
-            rows_with_hash: List[Tuple[str, Dict[str, Any]]] = []
-            for r in rows_to_process:
-                rr = dict(r)
-                h = make_hash(radicado, rr)
-                rows_with_hash.append((h, rr))
-
-            inserted_count, _ = insert_actuaciones_batch(conn, proceso_id, rows_with_hash)
-            rows_inserted = inserted_count
-
+            stop = None
+            max_rows = int(settings.baseline_rows)
         else:
+            # La lectura de la tabla se corta en la primera actuación ya guardada
+            max_db = parse_cpnu_date(
+                p.get("max_fecha_actuacion") if prefetched else get_max_fecha_actuacion(conn, proceso_id)
+            )
+            stop = StopCondition(
+                radicado=radicado,
+                watermark=max_db,
+                known_hashes=p.get("known_hashes") or frozenset(),
+            )
             max_rows = int(getattr(settings, "check_rows", 50))
-            rows_to_process = rows[:max_rows]
-
-            max_db = get_max_fecha_actuacion(conn, proceso_id)
+            probe_watermark = compute_probe_watermark(max_db, last_detail_at)
 
-            for r in rows_to_process:
-                rr = dict(r)
-                f = rr.get("fecha_actuacion")
-
-                if max_db and f and f < max_db:
-                    break
+        # Único punto de espera: el resto del flujo (DB) corre sin ceder el loop,
+        # así la conexión compartida nunca queda con transacciones intercaladas.
+        result = await scrape_actuaciones_cpnu_async(
+            radicado, pool, max_rows=max_rows, stop=stop, mode=query_mode, probe_watermark=probe_watermark
+        )
+        rows, used_mode = result.rows, result.used_mode
+        rows_extracted = len(rows)
 
-                h = make_hash(radicado, rr)
-                if insert_actuacion_if_new(conn, proceso_id, h, rr):
-                    rows_inserted += 1
+        hash_index = known_hashes.get(proceso_id)
+        rows_inserted, new_hashes = insert_actuaciones_batch(conn, proceso_id, rows, known=hash_index)
+        # Se guarda en vigilancia_control en la misma transacción que los inserts (fuente del watermark)
+        last_fecha, last_hash = newest_actuacion(rows, new_hashes, max_db)
 
         notified = decide_notified(is_momento0, notify_first, created_at, rows_inserted)
 
         update_worker_run_finish(
             conn,
             run_id,
-            status="OK",
+            status="UNCHANGED" if result.unchanged else "OK",
             used_mode=used_mode,
             rows_extracted=rows_extracted,
             rows_inserted=rows_inserted,
@@ -103,12 +165,26 @@ def run_one_process(conn, p: Dict[str, Any]) -> None:
             error_message=None,
             screenshot_path=screenshot_path,
             html_path=html_path,
+            request_stats=result.request_stats,
+        )
+        # Programación, estado de actuaciones, modo, detalle y lease en un solo UPDATE
+        update_scheduler_success(
+            conn,
+            proceso_id,
+            actuaciones_state=(existing + rows_inserted, last_fecha, last_hash),
+            preferred_mode=used_mode if used_mode in ("RECIENTES", "TODOS") else None,
+            mode_validated=query_mode != "TODOS",
+            detail_checked=not result.unchanged,
         )
-        update_scheduler_success(conn, proceso_id)
         conn.commit()
+        # Solo después del commit: el índice nunca debe tener hashes que la BD no tiene
+        if hash_index is not None:
+            hash_index.add(new_hashes)
+        return "UNCHANGED" if result.unchanged else "OK"
 
     except CpnuScrapeError as e:
         conn.rollback()
+        known_hashes.drop(proceso_id)
 
         screenshot_path = getattr(e, "screenshot_path", None) or screenshot_path
         html_path = getattr(e, "html_path", None) or html_path
@@ -124,12 +200,15 @@ def run_one_process(conn, p: Dict[str, Any]) -> None:
             error_message=str(getattr(e, "message", str(e))),
             screenshot_path=screenshot_path,
             html_path=html_path,
+            request_stats=getattr(e, "request_stats", None),
         )
         update_scheduler_failure(conn, proceso_id, str(getattr(e, "code", "ERROR")), str(getattr(e, "message", str(e))), fail_count)
         conn.commit()
+        return str(getattr(e, "code", "ERROR"))
 
     except Exception as e:
         conn.rollback()
+        known_hashes.drop(proceso_id)
 
         msg = str(e)
         update_worker_run_finish(
@@ -146,39 +225,226 @@ def run_one_process(conn, p: Dict[str, Any]) -> None:
         )
         update_scheduler_failure(conn, proceso_id, "ERROR", msg, fail_count)
         conn.commit()
+        return "ERROR"
 
 
 def bootstrap_control_rows(conn) -> None:
-    with conn.cursor() as cur:
-        cur.execute("SELECT id FROM despacho_ingreso_procesos WHERE vigilancia_activa=1")
-        ids = [int(r["id"]) for r in cur.fetchall()]
-    for pid in ids:
-        ensure_control_row(conn, pid)
+    changes = sync_control_rows(conn)
+    if any(changes.values()):
+        print(f"vigilancia_control: {changes}")
+
+
+def write_status() -> None:
+    # Estado de los controles compartidos para monitoreo (se sobrescribe en cada lote)
+    if not settings.status_path:
+        return
+    status = {
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        "governor": governor.snapshot(),
+        "breaker": breaker.snapshot(),
+        "timeouts": timeouts.snapshot(),
+        "selectors": selector_cache.stats(),
+        "known_hashes": known_hashes.snapshot(),
+    }
+    save_json(settings.status_path, status, ensure_ascii=False, indent=2)
+
+
+async def process_due(conn, p: Dict[str, Any], pool: BrowserPool, held: List[int]) -> None:
+    # La concurrencia la fija el gobernador AIMD según la respuesta de CPNU
+    async with governor.slot():
+        # Con CPNU caído no se gasta un timeout completo por proceso
+        ticket = breaker.allow()
+        if ticket is None:
+            held.append(int(p["proceso_id"]))
+            return
+        print(f"- proceso_id={p['proceso_id']} radicado={p['radicado']}")
+        started = time.monotonic()
+        try:
+            status = await run_one_process(conn, p, pool)
+        except BaseException:
+            breaker.cancel(ticket)
+            raise
+        breaker.record(status, ticket)
+        governor.record(status, time.monotonic() - started)
+
+
+def flush_held(conn, held: List[int]) -> None:
+    if not held:
+        return
+    # Se reprograman en bloque sin sumar fail_count: la falla es del sitio, no del proceso
+    minutes = max(1, (breaker.remaining_seconds() + 59) // 60)
+    reschedule_processes(conn, held, minutes)
     conn.commit()
-
-
-def main() -> None:
-    if not settings.db_name:
-        raise RuntimeError("DB_NAME no está configurado en .env")
-
+    print(f"Circuit breaker {breaker.state}: {len(held)} procesos reprogramados a {minutes} min.")
+    held.clear()
+
+
+def report() -> None:
+    timeouts.save()
+    write_status()
+    print(f"Estrategias de selector ganadoras: {selector_cache.stats()}")
+    print(f"Timeouts por fase: {timeouts.snapshot()}")
+    print(f"Circuit breaker: {breaker.snapshot()}")
+    print(f"Gobernador de concurrencia: {governor.snapshot()}")
+    print(f"Índice de hashes conocidos: {known_hashes.snapshot()}")
+
+
+async def keep_leases(conn, leased: Iterable[int]) -> None:
+    # Renueva los leases de lo que está en curso; se cancela al terminar el lote
+    every = max(5, int(settings.lease_seconds) // 3)
+    while True:
+        await asyncio.sleep(every)
+        ids = list(leased)
+        if not ids:
+            continue
+        try:
+            renewed = renew_leases(conn, ids)
+            conn.commit()
+        except Exception as e:
+            # Una falla puntual (p. ej. conexión caída) no debe matar al renovador: se reintenta en la próxima vuelta
+            print(f"No se pudieron renovar {len(ids)} leases: {e}")
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            continue
+        if renewed < len(ids):
+            print(f"Leases perdidos: {len(ids) - renewed} de {len(ids)} (vencieron antes de renovar).")
+
+
+async def run_batch(conn, due: List[Dict[str, Any]]) -> None:
+    held: List[int] = []
+    leased: Set[int] = {int(p["proceso_id"]) for p in due}
+
+    async def run(p: Dict[str, Any], pool: BrowserPool) -> None:
+        try:
+            await process_due(conn, p, pool, held)
+        finally:
+            leased.discard(int(p["proceso_id"]))
+
+    keeper = asyncio.create_task(keep_leases(conn, leased))
+    try:
+        async with BrowserPool() as pool:
+            await asyncio.gather(*(run(p, pool) for p in due))
+    finally:
+        keeper.cancel()
+
+    flush_held(conn, held)
+    report()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Worker de vigilancia CPNU")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=settings.daemon,
+        help="Proceso de larga duración: mantiene conexiones/navegador y toma trabajo continuamente.",
+    )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Aplica las migraciones pendientes de sql/ (schema_migrations) y sale.",
+    )
+    parser.add_argument(
+        "--migrate-raw",
+        action="store_true",
+        help="Reescribe raw_row_json de las actuaciones existentes al RAW_STORAGE_MODE actual y sale.",
+    )
+    parser.add_argument(
+        "--backfill-state",
+        action="store_true",
+        help="Recalcula actuaciones_count/last_fecha_actuacion/last_hash de vigilancia_control y sale.",
+    )
+    parser.add_argument(
+        "--check-state",
+        action="store_true",
+        help="Verifica las columnas denormalizadas contra actuaciones_x_proceso y sale.",
+    )
+    return parser.parse_args(argv)
+
+
+def run_once() -> None:
     conn = get_conn()
     try:
+        warn_pending(conn)
         bootstrap_control_rows(conn)
-
-        due = fetch_due_processes(conn)
+        reaped = reap_stale_runs(conn)
+        if reaped:
+            print(f"Corridas RUNNING abandonadas cerradas: {reaped}")
+
+        due = claim_due_processes(conn)
+        # Sin known_hashes.warm: en una corrida cron el índice se usaría una sola vez y
+        # cargarlo (todo el historial de hashes del lote) cuesta más que el pre-chequeo
+        prefetch_process_state(conn, due)
+        conn.commit()
         if not due:
             print("No hay procesos pendientes (next_run_at/cooldown).")
             return
 
-        print(f"Procesos a revisar: {len(due)} (DRY_RUN={settings.dry_run})")
-        for p in due:
-            print(f"- proceso_id={p['proceso_id']} radicado={p['radicado']}")
-            run_one_process(conn, p)
+        print(f"Procesos a revisar: {len(due)} (DRY_RUN={settings.dry_run}, CONCURRENCIA={governor.snapshot()['effective']})")
+        asyncio.run(run_batch(conn, due))
 
         print("Ejecución terminada.")
     finally:
         conn.close()
 
 
+def run_state_tools(args: argparse.Namespace) -> None:
+    conn = get_conn()
+    try:
+        if args.backfill_state:
+            updated = backfill_actuaciones_state(conn)
+            print(f"Backfill de vigilancia_control: {updated} filas actualizadas.")
+        if args.check_state:
+            result = check_actuaciones_state(conn)
+            mismatches = result["mismatches"]
+            print(f"Sin backfill: {result['pending_backfill']} | Inconsistentes: {len(mismatches)}")
+            for m in mismatches[:50]:
+                print(f"- proceso_id={m['proceso_id']} count={m['actuaciones_count']}/{m['real_count']} "
+                      f"fecha={m['last_fecha_actuacion']}/{m['real_last_fecha']} hash={m['last_hash']}")
+            if mismatches:
+                raise SystemExit(1)
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    if not settings.db_name:
+        raise RuntimeError("DB_NAME no está configurado en .env")
+    storage_mode()  # RAW_STORAGE_MODE inválido: falla al arrancar, no en cada insert
+
+    args = parse_args(argv)
+    if args.migrate:
+        conn = get_conn()
+        try:
+            applied = apply_migrations(conn)
+            print(f"Migraciones aplicadas: {len(applied)}")
+        finally:
+            conn.close()
+        return
+
+    if args.migrate_raw:
+        conn = get_conn()
+        try:
+            changed = migrate_raw_storage(conn)
+            print(f"raw_row_json migrado a {settings.raw_storage_mode}: {changed} filas.")
+        finally:
+            conn.close()
+        return
+
+    if args.backfill_state or args.check_state:
+        run_state_tools(args)
+        return
+
+    if args.daemon:
+        from .daemon import run_daemon
+
+        asyncio.run(run_daemon())
+        return
+
+    run_once()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import re
+from typing import List, Tuple
+
+import pymysql
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql")
+
+# Tabla/columna/índice ya existente (o índice ya borrado): el cambio se aplicó a mano antes del runner.
+# Se tolera por sentencia, así que cada ALTER TABLE de sql/ debe llevar un solo cambio: en un ALTER con
+# varios, el primero que ya existe haría saltar los demás y la migración quedaría marcada como aplicada.
+ALREADY_APPLIED_ERRNOS = (1050, 1060, 1061, 1091)
+
+_RE_MIGRATION = re.compile(r"^(\d{3})_[\w.-]+\.sql$")
+
+
+def list_migrations(directory: str = SQL_DIR) -> List[Tuple[str, str]]:
+    """(versión, ruta) de sql/NNN_*.sql en orden."""
+    found = []
+    for name in sorted(os.listdir(directory)):
+        if _RE_MIGRATION.match(name):
+            found.append((name[: -len(".sql")], os.path.join(directory, name)))
+    return found
+
+
+def split_statements(sql: str) -> List[str]:
+    lines = [ln for ln in sql.splitlines() if not ln.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def is_multi_change_alter(stmt: str) -> bool:
+    # ALTER TABLE con más de un cambio: alguna coma fuera de paréntesis y de comillas
+    if not stmt.lstrip().upper().startswith("ALTER TABLE"):
+        return False
+    depth = 0
+    quote = ""
+    for ch in stmt:
+        if quote:
+            if ch == quote:
+                quote = ""
+        elif ch in ("'", '"', "`"):
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            return True
+    return False
+
+
+def ensure_migrations_table(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version VARCHAR(128) NOT NULL PRIMARY KEY,
+              checksum CHAR(40) NOT NULL,
+              applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    conn.commit()
+
+
+def applied_versions(conn) -> List[str]:
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SELECT version FROM schema_migrations ORDER BY version")
+        except pymysql.err.ProgrammingError as e:
+            # 1146: la tabla todavía no existe (nunca se corrió --migrate)
+            if e.args and e.args[0] == 1146:
+                return []
+            raise
+        return [r["version"] for r in cur.fetchall()]
+
+
+def pending_migrations(conn, directory: str = SQL_DIR) -> List[Tuple[str, str]]:
+    done = set(applied_versions(conn))
+    return [(v, path) for v, path in list_migrations(directory) if v not in done]
+
+
+def apply_migrations(conn, directory: str = SQL_DIR) -> List[str]:
+    """
+    Aplica en orden las migraciones de sql/ que no estén en schema_migrations.
+    El DDL de MySQL hace commit implícito, así que una migración que falla a
+    medias se corrige y se vuelve a correr: los errores de "ya existe"
+    (tabla/columna/índice) se toleran para que sea reentrante.
+    """
+    ensure_migrations_table(conn)
+    applied = []
+    for version, path in pending_migrations(conn, directory):
+        with open(path, "r", encoding="utf-8") as f:
+            sql = f.read()
+        checksum = hashlib.sha1(sql.encode("utf-8")).hexdigest()
+
+        with conn.cursor() as cur:
+            for stmt in split_statements(sql):
+                try:
+                    cur.execute(stmt)
+                except pymysql.err.MySQLError as e:
+                    errno = e.args[0] if e.args else None
+                    if errno in ALREADY_APPLIED_ERRNOS and not is_multi_change_alter(stmt):
+                        print(f"  {version}: ya aplicado ({e.args[1] if len(e.args) > 1 else e})")
+                        continue
+                    conn.rollback()
+                    raise
+            cur.execute(
+                "INSERT INTO schema_migrations (version, checksum) VALUES (%s, %s)",
+                (version, checksum),
+            )
+        conn.commit()
+        print(f"Migración aplicada: {version}")
+        applied.append(version)
+    return applied
+
+
+def warn_pending(conn) -> None:
+    try:
+        pending = pending_migrations(conn)
+    except pymysql.err.MySQLError as e:
+        print(f"No se pudo revisar schema_migrations: {e}")
+        return
+    if pending:
+        names = ", ".join(v for v, _ in pending)
+        print(f"ATENCIÓN: migraciones pendientes ({names}). Ejecutar run_worker.py --migrate")
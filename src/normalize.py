@@ -1,15 +1,41 @@
 import json
 import re
 import hashlib
-from typing import Any, Dict
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+_RE_SPACES = re.compile(r"\s+")
 
 def norm_text(s: Any) -> str:
     if s is None:
         return ""
-    s = str(s)
-    s = s.replace("\u00a0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # \s ya incluye el espacio duro (\u00a0)
+    return _RE_SPACES.sub(" ", str(s)).strip()
+
+_RE_ISO_DATE = re.compile(r"^(\d{4})-(\d{1,2})-(\d{1,2})")
+_RE_DMY_DATE = re.compile(r"^(\d{1,2})[/-](\d{1,2})[/-](\d{4})")
+
+def parse_cpnu_date(value: Any) -> Optional[date]:
+    # CPNU muestra "2024-05-10" (tabla y API, esta con "T00:00:00"); se acepta también dd/mm/aaaa
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    s = norm_text(value)
+    m = _RE_ISO_DATE.match(s)
+    if m:
+        y, mo, d = m.groups()
+    else:
+        m = _RE_DMY_DATE.match(s)
+        if not m:
+            return None
+        d, mo, y = m.groups()
+    try:
+        return date(int(y), int(mo), int(d))
+    except ValueError:
+        return None
 
 def make_hash(radicado: str, row: Dict[str, Any]) -> str:
     parts = [
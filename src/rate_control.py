@@ -0,0 +1,113 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .settings import settings
+
+# Señales de que CPNU está saturado o nos está frenando
+CONGESTION_CODES = ("TIMEOUT", "SOFTBLOCK", "NETWORK")
+
+
+class AimdController:
+    """
+    Gobernador de concurrencia hacia CPNU (AIMD): mientras los éxitos llegan
+    con latencia estable sube el límite de a `increase` por "ventana" completa
+    de éxitos; ante timeouts o señales de bloqueo lo multiplica por
+    `decrease_factor`. Las bajadas se agrupan en decrease_cooldown segundos
+    para que una ráfaga de fallas de un mismo evento cuente una sola vez.
+    """
+
+    def __init__(
+        self,
+        initial: Optional[float] = None,
+        min_limit: Optional[float] = None,
+        max_limit: Optional[float] = None,
+    ):
+        self.min_limit = max(1.0, float(min_limit if min_limit is not None else settings.scrape_concurrency_min))
+        self.max_limit = float(max_limit if max_limit is not None else settings.scrape_concurrency_max)
+        start = float(initial if initial is not None else settings.scrape_concurrency)
+        self.limit = min(self.max_limit, max(self.min_limit, start))
+        self.increase = float(settings.aimd_increase)
+        self.decrease_factor = float(settings.aimd_decrease_factor)
+        self.latency_tolerance = float(settings.aimd_latency_tolerance)
+        self.decrease_cooldown = float(settings.aimd_decrease_cooldown_s)
+
+        self.active = 0
+        self.latency_ewma: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Se crea dentro del loop que la usa (asyncio.run crea uno por lote)
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+        return self._cond
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+        try:
+            yield
+        finally:
+            async with cond:
+                self.active -= 1
+                cond.notify_all()
+
+    def on_success(self, latency_s: float) -> None:
+        stable = self.latency_ewma is None or latency_s <= self.latency_ewma * self.latency_tolerance
+        self.latency_ewma = latency_s if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency_s
+        if stable and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + self.increase / max(1.0, self.limit))
+            self.increases += 1
+            self._wake()
+
+    def on_congestion(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.decreases += 1
+
+    def record(self, status: str, latency_s: float) -> None:
+        code = (status or "").upper()
+        if code in CONGESTION_CODES:
+            self.on_congestion()
+        elif code in ("OK", "UNCHANGED"):
+            self.on_success(latency_s)
+
+    def _wake(self) -> None:
+        cond = self._cond
+        if cond is None:
+            return
+
+        async def notify() -> None:
+            async with cond:
+                cond.notify_all()
+
+        try:
+            asyncio.get_running_loop().create_task(notify())
+        except RuntimeError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "effective": int(self.limit),
+            "active": self.active,
+            "latency_ewma_s": round(self.latency_ewma, 2) if self.latency_ewma is not None else None,
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+governor = AimdController()
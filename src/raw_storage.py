@@ -0,0 +1,78 @@
+import json
+import zlib
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from .settings import settings
+from .actuacion import TEXT_FIELDS, Actuacion
+from .normalize import parse_cpnu_date
+
+INLINE = "inline"
+COMPRESSED = "compressed"
+MINIMAL = "minimal"
+MODES = (INLINE, COMPRESSED, MINIMAL)
+
+# Campos de texto que también se guardan en columna DATE
+DATE_FIELDS = ("fecha_actuacion", "fecha_inicia_termino", "fecha_finaliza_termino", "fecha_registro")
+
+
+def storage_mode() -> str:
+    mode = settings.raw_storage_mode
+    if mode not in MODES:
+        raise RuntimeError(f"RAW_STORAGE_MODE inválido: {mode!r} (usar {', '.join(MODES)})")
+    return mode
+
+
+def _date_text(value: Any) -> str:
+    d = value if isinstance(value, date) else parse_cpnu_date(value)
+    return d.isoformat() if d else ""
+
+
+def minimal_fields(raw: Dict[str, str]) -> Dict[str, str]:
+    """Solo lo que las columnas tipadas no reproducen (texto de fecha no ISO, claves extra)."""
+    out = {}
+    for k, v in raw.items():
+        if k in DATE_FIELDS:
+            if v != _date_text(v):
+                out[k] = v
+        elif k not in TEXT_FIELDS:
+            out[k] = v
+    return out
+
+
+def encode_raw(raw: Dict[str, str], mode: Optional[str] = None) -> Tuple[Optional[str], Optional[bytes]]:
+    """(valor de raw_row_json, payload para actuaciones_raw) según el modo."""
+    mode = mode or storage_mode()
+    if mode == COMPRESSED:
+        return None, zlib.compress(json.dumps(raw, ensure_ascii=False).encode("utf-8"), 6)
+    if mode == MINIMAL:
+        extra = minimal_fields(raw)
+        return (json.dumps(extra, ensure_ascii=False) if extra else None), None
+    return json.dumps(raw, ensure_ascii=False), None
+
+
+def encode_actuacion(row: Actuacion, mode: Optional[str] = None) -> Tuple[Optional[str], Optional[bytes]]:
+    mode = mode or storage_mode()
+    if mode == INLINE:
+        # JSON ya calculado y cacheado en el modelo
+        return row.json, None
+    return encode_raw(row.to_dict(), mode)
+
+
+def decode_raw(db_row: Dict[str, Any], payload: Optional[bytes]) -> Dict[str, str]:
+    """
+    Reconstruye el JSON original de una fila de actuaciones_x_proceso, sea cual
+    sea el modo con que se guardó: payload comprimido, JSON inline completo o
+    parcial (minimal) superpuesto a las columnas tipadas.
+    """
+    if payload:
+        return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+    raw: Dict[str, str] = {}
+    for k in TEXT_FIELDS:
+        v = db_row.get(k)
+        raw[k] = _date_text(v) if k in DATE_FIELDS else ("" if v is None else str(v))
+    stored = db_row.get("raw_row_json")
+    if stored:
+        raw.update(json.loads(stored))
+    return raw
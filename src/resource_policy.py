@@ -0,0 +1,143 @@
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from .asset_cache import AssetCache
+from .settings import settings
+
+CACHEABLE_TYPES = ("script", "stylesheet")
+
+
+@dataclass
+class RequestStats:
+    allowed: int = 0
+    blocked: int = 0
+    # Bytes efectivamente descargados (headers + body) de las peticiones permitidas.
+    # De las bloqueadas no hay bytes: nunca salen a la red.
+    bytes_allowed: int = 0
+    # Bundles servidos desde la caché en disco (no salen a la red)
+    cached: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+def merge_stats(stats: List[RequestStats]) -> Dict[str, int]:
+    total: Dict[str, int] = {}
+    for st in stats:
+        for k, v in st.as_dict().items():
+            total[k] = total.get(k, 0) + v
+    return total
+
+
+class ResourcePolicy:
+    """
+    Ruteo de peticiones para el SPA de CPNU: aborta tipos de recurso que no
+    hacen falta para leer las tablas (imágenes, media, fuentes) y URLs de
+    analítica/terceros; el resto sigue normal. Cuenta lo permitido/bloqueado.
+    """
+
+    def __init__(
+        self,
+        blocked_types: Optional[Iterable[str]] = None,
+        blocked_patterns: Optional[Iterable[str]] = None,
+    ):
+        types = settings.block_resource_types if blocked_types is None else blocked_types
+        patterns = settings.block_url_patterns if blocked_patterns is None else blocked_patterns
+        self.blocked_types = frozenset(t.lower() for t in types)
+        self.blocked_patterns = tuple(p.lower() for p in patterns)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if (resource_type or "").lower() in self.blocked_types:
+            return True
+        u = (url or "").lower()
+        return any(p in u for p in self.blocked_patterns)
+
+    def _cacheable_host(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == h or host.endswith("." + h) for h in settings.asset_cache_hosts)
+
+    async def _fetch(self, route):
+        # Sitio caído: se aborta la ruta para que la navegación falle ya con net::ERR_FAILED
+        # (error NETWORK para el breaker) en vez de quedar colgada hasta el timeout
+        try:
+            response = await route.fetch()
+            return response, await response.body()
+        except Exception:
+            await route.abort("failed")
+            return None
+
+    async def _serve_cached(self, route, cache: AssetCache, stats: RequestStats) -> None:
+        req = route.request
+        hit = cache.get(req.url)
+        if hit is not None:
+            status, headers, body = hit
+            stats.cached += 1
+            await route.fulfill(status=status, headers=headers, body=body)
+            return
+
+        fetched = await self._fetch(route)
+        if fetched is None:
+            return
+        response, body = fetched
+        if response.status == 200:
+            try:
+                cache.put(req.url, response.status, response.headers, body)
+            except OSError:
+                pass  # sin caché en disco la petición igual se sirve
+        await route.fulfill(response=response, body=body)
+
+    async def _serve_document(self, route, cache: AssetCache) -> None:
+        # El HTML de entrada identifica el build: si cambia, los bundles guardados ya no sirven
+        fetched = await self._fetch(route)
+        if fetched is None:
+            return
+        response, body = fetched
+        if response.status == 200:
+            cache.check_build(hashlib.sha1(body).hexdigest())
+        await route.fulfill(response=response, body=body)
+
+    async def install(self, page, cache: Optional[AssetCache] = None) -> RequestStats:
+        stats = RequestStats()
+
+        async def route_request(route):
+            req = route.request
+            if self.should_block(req.url, req.resource_type):
+                stats.blocked += 1
+                await route.abort("blockedbyclient")
+                return
+
+            stats.allowed += 1
+            if cache is not None and req.method == "GET" and self._cacheable_host(req.url):
+                if req.resource_type in CACHEABLE_TYPES:
+                    await self._serve_cached(route, cache, stats)
+                    return
+                if req.resource_type == "document" and req.frame == page.main_frame:
+                    await self._serve_document(route, cache)
+                    return
+            await route.continue_()
+
+        async def handle(route):
+            # Playwright corre el handler como tarea suelta: una excepción dejaría la petición colgada
+            try:
+                await route_request(route)
+            except Exception:
+                try:
+                    await route.abort("failed")
+                except Exception:
+                    pass  # ya resuelta (o la página se cerró)
+
+        async def on_finished(request):
+            try:
+                sizes = await request.sizes()
+                stats.bytes_allowed += max(0, int(sizes.get("responseHeadersSize", 0))) + max(0, int(sizes.get("responseBodySize", 0)))
+            except Exception:
+                pass
+
+        await page.route("**/*", handle)
+        page.on("requestfinished", on_finished)
+        return stats
+
+
+resource_policy = ResourcePolicy()
@@ -0,0 +1,57 @@
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (nombre de la estrategia, función page -> locator)
+Strategy = Tuple[str, Callable[[Any], Any]]
+
+
+class SelectorCache:
+    """
+    Recuerda qué estrategia de selector funcionó la última vez para cada
+    elemento de la UI y la prueba primero. En lugar de encadenar timeouts,
+    espera a que aparezca cualquiera de las estrategias (locator.or_) y
+    después elige la primera que coincide en orden de preferencia.
+    """
+
+    def __init__(self):
+        self._winner: Dict[str, str] = {}
+        self._wins: Dict[str, Counter] = {}
+
+    def order(self, name: str, strategies: List[Strategy]) -> List[Strategy]:
+        winner = self._winner.get(name)
+        if not winner:
+            return list(strategies)
+        return sorted(strategies, key=lambda s: s[0] != winner)
+
+    def record(self, name: str, strategy: str) -> None:
+        self._winner[name] = strategy
+        self._wins.setdefault(name, Counter())[strategy] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: dict(c) for name, c in self._wins.items()}
+
+    async def first(self, page, name: str, strategies: List[Strategy], timeout: float, state: str = "visible"):
+        ordered = [(sname, build(page)) for sname, build in self.order(name, strategies)]
+        if state == "visible":
+            # count() también cuenta elementos ocultos: se descartan antes de elegir
+            ordered = [(sname, loc.filter(visible=True)) for sname, loc in ordered]
+
+        combined = ordered[0][1]
+        for _, loc in ordered[1:]:
+            combined = combined.or_(loc)
+        await combined.first.wait_for(state=state, timeout=timeout)
+
+        chosen: Optional[Tuple[str, Any]] = None
+        for sname, loc in ordered:
+            if await loc.count() > 0:
+                chosen = (sname, loc.first)
+                break
+        if chosen is None:
+            # Apareció y desapareció entre la espera y el conteo: se usa el combinado
+            return combined.first
+
+        self.record(name, chosen[0])
+        return chosen[1]
+
+
+selector_cache = SelectorCache()
@@ -1,5 +1,7 @@
 import os
+import socket
 from dataclasses import dataclass
+from typing import Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,12 +10,39 @@ def _int(name: str, default: int) -> int:
     v = os.getenv(name)
     return int(v) if v and v.strip() else default
 
+def _float(name: str, default: float) -> float:
+    v = os.getenv(name)
+    return float(v) if v and v.strip() else default
+
 def _bool(name: str, default: bool) -> bool:
     v = os.getenv(name)
     if v is None:
         return default
     return v.strip() in ("1", "true", "True", "yes", "YES")
 
+def _list(name: str, default: Tuple[str, ...]) -> Tuple[str, ...]:
+    v = os.getenv(name)
+    if v is None:
+        return default
+    return tuple(x.strip() for x in v.split(",") if x.strip())
+
+# Perfil de Chromium para un worker headless (sin GPU, extensiones ni tareas de fondo)
+DEFAULT_CHROMIUM_ARGS = (
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+)
+
 @dataclass(frozen=True)
 class Settings:
     db_host: str = os.getenv("DB_HOST", "127.0.0.1")
@@ -23,11 +52,88 @@ class Settings:
     db_password: str = os.getenv("DB_PASSWORD", "")
 
     headless: bool = _bool("HEADLESS", True)
+    browser_max_uses: int = _int("BROWSER_MAX_USES", 50)
+    chromium_args: Tuple[str, ...] = _list("CHROMIUM_ARGS", DEFAULT_CHROMIUM_ARGS)
+    asset_cache: bool = _bool("ASSET_CACHE", True)
+    asset_cache_dir: str = os.getenv("ASSET_CACHE_DIR", os.path.join("cache", "cpnu_assets"))
+    asset_cache_max_mb: int = _int("ASSET_CACHE_MAX_MB", 100)
+    asset_cache_max_age_hours: int = _int("ASSET_CACHE_MAX_AGE_HOURS", 24)
+    asset_cache_hosts: Tuple[str, ...] = _list("ASSET_CACHE_HOSTS", ("consultaprocesos.ramajudicial.gov.co",))
+    storage_state_path: str = os.getenv("STORAGE_STATE_PATH", os.path.join("cache", "cpnu_storage_state.json"))
+    storage_state_refresh_minutes: int = _int("STORAGE_STATE_REFRESH_MINUTES", 60)
+    block_resource_types: Tuple[str, ...] = _list("BLOCK_RESOURCE_TYPES", ("image", "media", "font"))
+    block_url_patterns: Tuple[str, ...] = _list(
+        "BLOCK_URL_PATTERNS",
+        (
+            "google-analytics.com",
+            "googletagmanager.com",
+            "doubleclick.net",
+            "facebook.net",
+            "hotjar.com",
+            "clarity.ms",
+            "newrelic.com",
+            "nr-data.net",
+        ),
+    )
+    # BROWSER: flujo Playwright; API: endpoints JSON de CPNU con respaldo en el navegador
+    cpnu_source: str = os.getenv("CPNU_SOURCE", "BROWSER").strip().upper()
+    cpnu_api_url: str = os.getenv("CPNU_API_URL", "https://consultaprocesos.ramajudicial.gov.co:448/api/v2")
+    cpnu_api_pool_size: int = _int("CPNU_API_POOL_SIZE", 4)
+    cpnu_api_timeout_s: int = _int("CPNU_API_TIMEOUT_S", 20)
+    cpnu_api_verify_ssl: bool = _bool("CPNU_API_VERIFY_SSL", True)
+
     batch_size: int = _int("BATCH_SIZE", 5)
+    scrape_concurrency: int = _int("SCRAPE_CONCURRENCY", 3)
+    scrape_concurrency_min: int = _int("SCRAPE_CONCURRENCY_MIN", 1)
+    scrape_concurrency_max: int = _int("SCRAPE_CONCURRENCY_MAX", 8)
+    aimd_increase: float = _float("AIMD_INCREASE", 1.0)
+    aimd_decrease_factor: float = _float("AIMD_DECREASE_FACTOR", 0.5)
+    aimd_latency_tolerance: float = _float("AIMD_LATENCY_TOLERANCE", 1.5)
+    aimd_decrease_cooldown_s: int = _int("AIMD_DECREASE_COOLDOWN_S", 30)
+    status_path: str = os.getenv("STATUS_PATH", os.path.join("cache", "worker_status.json"))
     check_rows: int = _int("CHECK_ROWS", 50)
+    extract_chunk_rows: int = _int("EXTRACT_CHUNK_ROWS", 5)
     baseline_rows: int = _int("BASELINE_ROWS", 1)
     new_process_window_hours: int = _int("NEW_PROCESS_WINDOW_HOURS", 24)
     interval_minutes: int = _int("INTERVAL_MINUTES", 60)
+    mode_revalidate_days: int = _int("MODE_REVALIDATE_DAYS", 7)
+    hedged_queries: bool = _bool("HEDGED_QUERIES", True)
+    probe_results: bool = _bool("PROBE_RESULTS", True)
+    probe_full_every_hours: int = _int("PROBE_FULL_EVERY_HOURS", 24)
+
+    adaptive_timeouts: bool = _bool("ADAPTIVE_TIMEOUTS", True)
+    adaptive_timeouts_path: str = os.getenv("ADAPTIVE_TIMEOUTS_PATH", os.path.join("cache", "cpnu_timeouts.json"))
+    adaptive_timeouts_window: int = _int("ADAPTIVE_TIMEOUTS_WINDOW", 200)
+    adaptive_timeouts_min_samples: int = _int("ADAPTIVE_TIMEOUTS_MIN_SAMPLES", 20)
+    adaptive_timeouts_percentile: float = _float("ADAPTIVE_TIMEOUTS_PERCENTILE", 0.99)
+    adaptive_timeouts_factor: float = _float("ADAPTIVE_TIMEOUTS_FACTOR", 1.5)
+    adaptive_timeouts_floor_ms: int = _int("ADAPTIVE_TIMEOUTS_FLOOR_MS", 5000)
+    adaptive_timeouts_ceil_ms: int = _int("ADAPTIVE_TIMEOUTS_CEIL_MS", 120000)
+
+    breaker_window: int = _int("BREAKER_WINDOW", 10)
+    breaker_threshold: int = _int("BREAKER_THRESHOLD", 5)
+    breaker_open_minutes: int = _int("BREAKER_OPEN_MINUTES", 10)
+    breaker_state_path: str = os.getenv("BREAKER_STATE_PATH", os.path.join("cache", "cpnu_breaker.json"))
+
+    # Identidad del worker para los leases de vigilancia_control (único por máquina/proceso)
+    worker_id: str = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+    lease_seconds: int = _int("LEASE_SECONDS", 600)
+
+    # Índice en memoria de hashes ya guardados por proceso (set exacto o Bloom filter)
+    known_hash_cache: bool = _bool("KNOWN_HASH_CACHE", True)
+    known_hash_max_processes: int = _int("KNOWN_HASH_MAX_PROCESSES", 5000)
+    known_hash_exact_max: int = _int("KNOWN_HASH_EXACT_MAX", 2000)
+    known_hash_bloom_fp: float = _float("KNOWN_HASH_BLOOM_FP", 0.01)
+
+    # raw_row_json: inline (JSON completo), compressed (zlib en actuaciones_raw por hash),
+    # minimal (solo lo que las columnas tipadas no reproducen)
+    raw_storage_mode: str = os.getenv("RAW_STORAGE_MODE", "inline").strip().lower()
+
+    daemon: bool = _bool("DAEMON", False)
+    daemon_poll_seconds: int = _int("DAEMON_POLL_SECONDS", 30)
+    daemon_status_seconds: int = _int("DAEMON_STATUS_SECONDS", 60)
+    bootstrap_every_minutes: int = _int("BOOTSTRAP_EVERY_MINUTES", 10)
+    bootstrap_chunk: int = _int("BOOTSTRAP_CHUNK", 5000)
 
     dry_run: bool = _bool("DRY_RUN", True)
 